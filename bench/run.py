@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""Parse and evaluation benchmarks.
+
+    python -m bench.run -o bench.json                       # run and save
+    python -m bench.run --baseline bench.json               # run and compare
+    python -m bench.run -i new.json --baseline old.json     # compare two saved runs
+
+Every result is a cost (seconds per operation, or bytes), so lower is better.
+A result more than `--threshold` (relative) above its baseline is reported as
+a regression and makes the command exit with status 1.  Memory results need
+`tracemalloc` (python 3.4+) and are left out without it.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import json
+import io
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:     # py2
+    tracemalloc = None
+
+from yepr import rulefile
+from yepr.parser import Parser
+from yepr.ruleset import RuleSet
+
+
+FORMAT_VERSION = 1
+
+_benchmarks = []
+
+
+def benchmark(fn):
+    _benchmarks.append(fn)
+    return fn
+
+
+def _autorange(timer):
+    # Timer.autorange() is python 3.6+
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= 0.2:
+            return number, elapsed
+        number *= 2
+
+
+def per_call(fn, min_time=0.2, repeat=3):
+    """Best-of-`repeat` seconds per call of `fn`."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange() if hasattr(timer, 'autorange') else _autorange(timer)
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_memory(fn):
+    """Peak bytes allocated while calling `fn`, None without tracemalloc."""
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# expressions {{{
+def chain(size):
+    """`size` equality tests joined by and/or."""
+    expr = 'fa == "v0"'
+    for i in range(1, size):
+        expr += (' and ' if i % 3 else ' or ') + 'f{} == "v{}"'.format(chr(97 + i % 26), i)
+    return expr
+
+
+def nested(depth):
+    """`depth` levels of parentheses and unary operators around a comparison."""
+    expr = 'a < b'
+    for i in range(depth):
+        expr = '!(' + expr + ' or x' + ')' if i % 2 else '(' + expr + ') and y'
+    return expr
+
+
+SIZES = (1, 10, 50)
+DEPTHS = (1, 5, 20)
+
+NODE_TYPES = [
+    ('literal', 'abc'),
+    ('number', '123'),
+    ('unary', '-123'),
+    ('binary', '123 < 456'),
+    ('in', 'b in abc'),
+    ('eq', 'abc == abc'),
+    ('regex', 'abc =~ "^a"'),
+    ('and', 'a and b'),
+    ('or', 'a or b'),
+    ('cond', 'a ? b : c'),
+    ('name', '$a'),
+    ('path', '$u.geo.cc'),
+]
+# }}} expressions
+
+
+# benchmarks {{{
+@benchmark
+def parse_latency(results):
+    for engine in ('grako', 'fast'):
+        parser = Parser(cache_size=0, engine=engine)
+        # grako is slow enough that a handful of calls is representative
+        min_time = 0.05 if engine == 'grako' else 0.2
+
+        for size in SIZES:
+            expr = chain(size)
+            results['parse.{}.size_{}'.format(engine, size)] = per_call(
+                lambda: parser.parse(expr), min_time=min_time)
+
+        for depth in DEPTHS:
+            expr = nested(depth)
+            results['parse.{}.depth_{}'.format(engine, depth)] = per_call(
+                lambda: parser.parse(expr), min_time=min_time)
+
+
+@benchmark
+def parse_grako_tuning(results):
+    """Long expressions, grako as it was configured before vs reused and without memo."""
+    configs = [
+        ('default', lambda: Parser(cache_size=0, memoize=True, left_recursion=True)),
+        ('tuned', lambda: Parser(cache_size=0)),
+    ]
+    for size in (50, 200):
+        expr = chain(size)
+        for name, make in configs:
+            parser = make()
+            results['parse.grako.{}.size_{}'.format(name, size)] = per_call(
+                lambda: parser.parse(expr), min_time=0.05)
+
+            parser.parse(expr)  # the reused parser exists already
+            peak = peak_memory(lambda: parser.parse(expr))
+            if peak is not None:
+                results['memory.grako.{}.size_{}'.format(name, size)] = peak
+
+
+@benchmark
+def parse_bulk(results):
+    """Seconds per expression of a batch where 30% of the texts repeat others."""
+    for engine, count in (('fast', 2000), ('grako', 100)):
+        exprs = [chain(10).replace('"v1"', '"w{}"'.format(i)) for i in range(count * 7 // 10)]
+        exprs += exprs[:count - len(exprs)]
+
+        parser = Parser(cache_size=0, engine=engine)
+        results['parse_many.{}.loop'.format(engine)] = per_call(
+            lambda: [parser.parse(expr) for expr in exprs], min_time=0.05) / count
+        results['parse_many.{}.serial'.format(engine)] = per_call(
+            lambda: parser.parse_many(exprs, workers=0), min_time=0.05) / count
+        results['parse_many.{}.pool'.format(engine)] = per_call(
+            lambda: parser.parse_many(exprs, workers=None), min_time=0.05) / count
+
+
+@benchmark
+def rule_file(results):
+    """Loading a rule file: parsing every rule vs from an up to date cache,
+    with and without then decoding every tree."""
+    tmp = tempfile.mkdtemp()
+    try:
+        for engine, count in (('fast', 2000), ('grako', 100)):
+            path = os.path.join(tmp, '{}.yepr'.format(engine))
+            with io.open(path, 'w', encoding='utf-8') as f:
+                for i in range(count):
+                    f.write('r{}: {}\n'.format(i, chain(10).replace('"v1"', '"w{}"'.format(i))))
+
+            parser = Parser(cache_size=0, engine=engine)
+            results['rulefile.{}.parse'.format(engine)] = per_call(
+                lambda: rulefile.load(path, parser, cache_path=False), min_time=0.05)
+
+            rulefile.load(path, parser)
+            results['rulefile.{}.cached'.format(engine)] = per_call(
+                lambda: rulefile.load(path, parser), min_time=0.05)
+            results['rulefile.{}.cached.decoded'.format(engine)] = per_call(
+                lambda: list(rulefile.load(path, parser)), min_time=0.05)
+    finally:
+        shutil.rmtree(tmp)
+
+
+@benchmark
+def parse_cold_warm(results):
+    expr = chain(10)
+
+    results['parse.cold'] = per_call(lambda: Parser().parse(expr), min_time=0.05)
+
+    parser = Parser()
+    parser.parse(expr)
+    results['parse.warm'] = per_call(lambda: parser.parse(expr))
+
+
+@benchmark
+def ex_throughput(results):
+    parser = Parser(engine='fast')
+    ctx = {'a': 1, 'u': {'geo': {'cc': 'fr'}}}
+
+    for name, expr in NODE_TYPES:
+        node = parser.parse(expr)
+        fn = node.compile()
+
+        results['ex.{}'.format(name)] = per_call(lambda: node.ex(ctx))
+        results['compiled.{}'.format(name)] = per_call(lambda: fn(ctx))
+
+
+@benchmark
+def ruleset(results):
+    parser = Parser(engine='fast')
+    # 200 rules drawing on 20 distinct comparisons
+    terms = ['f{} == "v{}"'.format(chr(97 + i), i) for i in range(20)]
+    rules = [
+        ('r{}'.format(i), '{} and {} or {}'.format(terms[i % 20], terms[i * 7 % 20], terms[i * 3 % 20]))
+        for i in range(200)
+    ]
+    ctx = {}
+
+    fns = [(name, parser.parse(expr).compile()) for name, expr in rules]
+    results['ruleset.separate'] = per_call(lambda: dict((name, fn(ctx)) for name, fn in fns))
+
+    rule_set = RuleSet(rules, parser=parser)
+    results['ruleset.shared'] = per_call(lambda: rule_set.ex(ctx))
+
+
+@benchmark
+def ruleset_regex(results):
+    parser = Parser(engine='fast')
+    # 40 rules, each testing the request path against its own pattern
+    rules = [
+        ('r{}'.format(i), '$path =~ /^\\/api\\/v{}\\/(users|items)\\/[0-9]+/ and $m == "GET"'.format(i))
+        for i in range(40)
+    ]
+    ctx = {'path': '/api/v7/items/123?full=1', 'm': 'GET'}
+
+    fns = [(name, parser.parse(expr).compile()) for name, expr in rules]
+    results['ruleset.regex.separate'] = per_call(lambda: dict((name, fn(ctx)) for name, fn in fns))
+
+    rule_set = RuleSet(rules, parser=parser)
+    results['ruleset.regex.shared'] = per_call(lambda: rule_set.ex(ctx))
+
+
+@benchmark
+def ruleset_keywords(results):
+    parser = Parser(engine='fast')
+    # 300 rules, each looking for its own keyword in a 4KB body
+    rules = [('r{}'.format(i), '"kw{}x" in $body'.format(i)) for i in range(300)]
+    ctx = {'body': ''.join('w{} '.format(i) for i in range(800))}
+
+    fns = [(name, parser.parse(expr).compile()) for name, expr in rules]
+    results['ruleset.keywords.separate'] = per_call(lambda: dict((name, fn(ctx)) for name, fn in fns))
+
+    rule_set = RuleSet(rules, parser=parser)
+    results['ruleset.keywords.shared'] = per_call(lambda: rule_set.ex(ctx))
+
+
+@benchmark
+def parse_memory(results):
+    for engine in ('grako', 'fast'):
+        parser = Parser(cache_size=0, engine=engine)
+        for size in SIZES:
+            expr = chain(size)
+
+            peak = peak_memory(lambda: parser.parse(expr))
+            if peak is not None:
+                results['memory.{}.size_{}'.format(engine, size)] = peak
+
+
+@benchmark
+def import_time(results):
+    code = (
+        'from timeit import default_timer as timer; t = timer(); import yepr.parser; '
+        'print(timer() - t)'
+    )
+    results['import.yepr.parser'] = min(
+        float(subprocess.check_output([sys.executable, '-c', code]))
+        for _ in range(5)
+    )
+# }}} benchmarks
+
+
+def run(only=None):
+    results = {}
+    for fn in _benchmarks:
+        if only and not any(o in fn.__name__ for o in only):
+            continue
+        fn(results)
+
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print old/new per result; return the names that got slower than `threshold`."""
+    regressions = []
+    old, new = baseline['results'], current['results']
+
+    for name in sorted(set(old) ^ set(new)):
+        print('{:<32} only in the {}'.format(name, 'baseline' if name in old else 'current results'))
+
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name] / old[name] if old[name] else 1.0
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = '  improved'
+
+        print('{:<32} {:>12.4g} {:>12.4g} {:>7.2f}x{}'.format(name, old[name], new[name], ratio, flag))
+
+    return regressions
+
+
+def load(parser, path):
+    """Saved results, rejected (through `parser`) if of another format version."""
+    with open(path) as f:
+        results = json.load(f)
+
+    if results.get('version') != FORMAT_VERSION:
+        parser.error('{}: results format {} is not supported (expecting {})'.format(
+            path, results.get('version'), FORMAT_VERSION))
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="yepr benchmarks")
+    parser.add_argument('-o', '--output', help="save the results as JSON")
+    parser.add_argument('-i', '--input', help="use saved results instead of running")
+    parser.add_argument('-b', '--baseline', help="saved results to compare against")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument('-k', '--only', action='append',
+                        help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        current = load(parser, args.input)
+    else:
+        current = run(args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if not args.baseline:
+        for name, val in sorted(current['results'].items()):
+            print('{:<32} {:>12.4g}'.format(name, val))
+        return 0
+
+    baseline = load(parser, args.baseline)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print('{} regression(s) over {:.0%}'.format(len(regressions), args.threshold))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
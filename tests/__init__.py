@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from yepr import nodes
+
+
+class Var(nodes.Node):
+    """A node class of its own, that no engine has a handler for.
+
+    Reads `ctx[name]`, counting its evaluations in `calls` and recording the
+    values read in `seen` when given.  Unlike `Identifier`, equal only to
+    itself.
+    """
+
+    def __init__(self, name='x', seen=None):
+        self.name, self.seen = name, seen
+        self.calls = 0
+
+    def ex(self, ctx):
+        self.calls += 1
+        if self.seen is not None:
+            self.seen.append(ctx[self.name])
+        return ctx[self.name]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Tests of `yepr.aio`, python 3.5+ syntax: loaded by test_aio.py on those only."""
+import asyncio
+from unittest import TestCase
+
+from yepr import nodes
+from yepr.parser import Parser
+
+from . import Var
+
+
+class AsyncVar(Var):
+    """Fetches its value itself, instead of going through the fallback."""
+
+    async def ex_async(self, ctx):
+        return await ctx.get(self.name)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestExAsync(TestCase):
+    def setUp(self):
+        self.fetched = []
+
+    def fetch(self, name, val, delay=0.0):
+        async def resolver():
+            self.fetched.append(name)
+            await asyncio.sleep(delay)
+            return val
+
+        return resolver
+
+    def test_values(self):
+        ctx = {'a': 1, 'b': self.fetch('b', 2), 'c': asyncio.sleep(0, result='x')}
+        node = nodes.CondExp(
+            nodes.BinaryExp(nodes.BinaryOp.LT, nodes.Identifier('a'), nodes.Identifier('b')),
+            nodes.EqExp(nodes.EqOp.RE, nodes.Identifier('c'), nodes.LiteralString('^x')),
+            nodes.Identifier('nope'),
+        )
+        self.assertIs(True, run(node.ex_async(ctx)))
+
+        # plain values and literals only: same as ex()
+        tree = nodes.UnaryExp(nodes.UnaryOp.HASH, nodes.LiteralString('abc'))
+        self.assertEqual(3, run(tree.ex_async({})))
+
+    def test_short_circuit(self):
+        ctx = {'a': self.fetch('a', 0), 'b': self.fetch('b', 1), 'c': self.fetch('c', 2)}
+
+        node = nodes.LogicAndExp(nodes.LogicOp.AND, nodes.Identifier('a'), nodes.Identifier('b'))
+        self.assertEqual(0, run(node.ex_async(ctx)))
+        self.assertEqual(['a'], self.fetched)
+
+        node = nodes.LogicOrExp(nodes.LogicOp.OR, nodes.Identifier('b'), nodes.Identifier('c'))
+        self.assertEqual(1, run(node.ex_async(ctx)))
+        self.assertEqual(['a', 'b'], self.fetched)
+
+    def test_concurrent_and_shared(self):
+        ctx = {'a': self.fetch('a', 1, 0.2), 'b': self.fetch('b', 2, 0.2)}
+        # a is read three times, fetched once; a and b are fetched side by side
+        node = nodes.BinaryExp(
+            nodes.BinaryOp.LT,
+            nodes.BinaryExp(nodes.BinaryOp.LE, nodes.Identifier('a'), nodes.Identifier('b')),
+            nodes.CondExp(nodes.Identifier('a'), nodes.Identifier('b'), nodes.Identifier('a')),
+        )
+
+        loop = asyncio.new_event_loop()
+        try:
+            start = loop.time()
+            self.assertIs(True, loop.run_until_complete(node.ex_async(ctx)))
+            elapsed = loop.time() - start
+        finally:
+            loop.close()
+
+        self.assertEqual(['a', 'b'], sorted(self.fetched))
+        self.assertLess(elapsed, 0.35)
+
+    def test_fallback(self):
+        ctx = {'a': self.fetch('a', 'x'), 'b': self.fetch('b', 'y')}
+        node = nodes.EqExp(nodes.EqOp.EQ, Var('a'), nodes.LiteralString('x'))
+
+        self.assertIs(True, run(node.ex_async(ctx)))
+        self.assertEqual(['a', 'b'], sorted(self.fetched))
+
+        del self.fetched[:]
+        node = nodes.EqExp(nodes.EqOp.EQ, AsyncVar('b'), nodes.LiteralString('y'))
+        self.assertIs(True, run(node.ex_async(ctx)))
+        self.assertEqual(['b'], self.fetched)
+
+    def test_errors(self):
+        async def fail():
+            raise KeyError('gone')
+
+        node = nodes.BinaryExp(nodes.BinaryOp.LT, nodes.Identifier('a'), nodes.Identifier('b'))
+        with self.assertRaises(KeyError):
+            run(node.ex_async({'a': fail, 'b': self.fetch('b', 1, 0.5)}))
+
+    def test_identifier(self):
+        ctx = {'user': self.fetch('user', {'geo': {'cc': 'fr'}}), 'plan': self.fetch('plan', 'pro')}
+        node = Parser(engine='fast').parse('$user.geo.cc == "fr" or $plan')
+
+        self.assertIs(True, run(node.ex_async(ctx)))
+        self.assertEqual(['user'], self.fetched)
+        self.assertIsNone(run(Parser(engine='fast').parse('$nope.x').ex_async({})))
+
+        async def fail():
+            raise KeyError('gone')
+
+        with self.assertRaises(KeyError):
+            run(Parser(engine='fast').parse('$user.geo').ex_async({'user': fail}))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import json
+
+from yepr import nodes
+from yepr.adaptive import AdaptiveRule, chain
+from yepr.parser import Parser
+
+
+class Slow(nodes.Node):
+    """Impure from the adaptive point of view: a node class of its own."""
+
+    def ex(self, ctx):
+        return ctx['slow']
+
+
+def order(node):
+    return [n.ast() for n in chain(node)]
+
+
+class TestAdaptive(TestCase):
+    def setUp(self):
+        self.parser = Parser(engine='fast')
+
+    def parse(self, expr):
+        return self.parser.parse(expr)
+
+    def train(self, rule, contexts):
+        for ctx in contexts:
+            rule.ex(ctx)
+        rule.ex(contexts[0])    # past the sample: optimizes
+
+    def test_reorder_and(self):
+        # the regex is costly and nearly always true, the equality is selective
+        tree = self.parse('$body =~ "(a|b)*c.*d+e" and $region == "eu"')
+        rule = AdaptiveRule(tree, sample=200)
+        contexts = [{'body': 'xx abc dde ' * 20, 'region': 'eu' if i % 10 == 0 else 'us'} for i in range(200)]
+        self.train(rule, contexts)
+
+        self.assertEqual(order(self.parse('$region == "eu" and $body =~ "(a|b)*c.*d+e"')), order(rule.tree))
+        for ctx in contexts:
+            self.assertEqual(bool(tree.ex(ctx)), rule.ex(ctx))
+
+    def test_reorder_or(self):
+        tree = self.parse('$a == 1 or $b == 1 or $c == 1')
+        rule = AdaptiveRule(tree, sample=100)
+        self.train(rule, [{'a': 0, 'b': 0, 'c': 1}] * 100)
+
+        self.assertEqual(self.parse('$c == 1').ast(), chain(rule.tree)[0].ast())
+
+    def test_stats_round_trip(self):
+        tree = self.parse('$a == 1 or $b == 1')
+        rule = AdaptiveRule(tree, sample=50)
+        self.train(rule, [{'a': 0, 'b': 1}] * 50)
+
+        stats = json.loads(json.dumps(rule.stats()))
+        other = AdaptiveRule(self.parse('$a == 1 or $b == 1'), stats=stats)
+        self.assertEqual(order(rule.tree), order(other.tree))
+        self.assertEqual(order(self.parse('$b == 1 or $a == 1')), order(other.tree))
+
+        with self.assertRaises(ValueError):
+            AdaptiveRule(tree, stats={'version': 0, 'operands': {}})
+
+    def test_value_context(self):
+        # not booleans, not a predicate: `$a and $b` gives $b's value, keep the order
+        tree = self.parse('$a and $b')
+        rule = AdaptiveRule(tree, sample=20, predicate=False)
+        self.train(rule, [{'a': 'x', 'b': 0}] * 20)
+        self.assertEqual(order(tree), order(rule.tree))
+        self.assertEqual(0, rule.ex({'a': 'x', 'b': 0}))
+
+        # ... unless only its truth is used
+        tree = self.parse('($a and $b) ? 1 : 2')
+        rule = AdaptiveRule(tree, sample=20, predicate=False)
+        self.train(rule, [{'a': 'x', 'b': 0}] * 20)
+        self.assertEqual(order(self.parse('$b and $a')), order(rule.tree.cond))
+
+    def test_impure(self):
+        tree = nodes.LogicAndExp(nodes.LogicOp.AND, Slow(), self.parse('$a == 1'))
+        rule = AdaptiveRule(tree, sample=10)
+        self.train(rule, [{'slow': True, 'a': 0}] * 10)
+        self.assertIsInstance(chain(rule.tree)[0], Slow)
+
+    def test_errors_keep_written_order(self):
+        # reordered, `#$s` would run first and fail on None
+        tree = self.parse('$s and #$s > 3')
+        rule = AdaptiveRule(tree, stats={'version': 1, 'operands': {}})
+        stats = rule.stats()
+        self.assertEqual({}, stats['operands'])
+
+        self.assertIs(False, rule.ex({'s': None}))
+        self.assertIs(True, rule.ex({'s': 'abcd'}))
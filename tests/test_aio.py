@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase, skip
+import sys
+
+
+if sys.version_info >= (3, 5):
+    from .aio_cases import TestExAsync
+else:
+    # async/await would be a SyntaxError on collection
+    @skip('yepr.aio needs python 3.5+')
+    class TestExAsync(TestCase):
+        pass
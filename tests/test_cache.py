@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import threading
+
+from yepr.cache import LRUCache
+
+
+class TestLRUCache(TestCase):
+    def test_base(self):
+        cache = LRUCache(2)
+
+        self.assertIs(None, cache.get('a'))
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+
+        # 'b' is the least recently used one now
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+
+        info = cache.info()
+        self.assertEqual(1, info.hits)
+        self.assertEqual(1, info.misses)
+        self.assertEqual(1, info.evictions)
+        self.assertEqual(2, info.maxsize)
+        self.assertEqual(2, info.currsize)
+
+        self.assertEqual(0.5, info.hit_rate)
+
+        cache.clear()
+        self.assertEqual((0, 0, 0, 2, 0), tuple(cache.info()))
+        self.assertEqual(0.0, cache.info().hit_rate)
+
+    def test_resize(self):
+        cache = LRUCache(4)
+        for i in range(4):
+            cache.set(i, i)
+
+        cache.resize(2)
+        self.assertEqual([2, 3], sorted(cache._data))
+        self.assertEqual(2, cache.info().evictions)
+
+    def test_disabled_and_unbounded(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertEqual(0, len(cache))
+
+        cache = LRUCache(None)
+        for i in range(100):
+            cache.set(i, i)
+        self.assertEqual(100, len(cache))
+        self.assertEqual(0, cache.info().evictions)
+
+    def test_get_or_create(self):
+        cache = LRUCache(10)
+        calls = []
+
+        def factory(key):
+            calls.append(key)
+            return key * 2
+
+        self.assertEqual(4, cache.get_or_create(2, factory))
+        self.assertEqual(4, cache.get_or_create(2, factory))
+        self.assertEqual([2], calls)
+
+    def test_threads(self):
+        cache = LRUCache(50)
+
+        def work():
+            for i in range(1000):
+                cache.get_or_create(i % 80, lambda k: k)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        info = cache.info()
+        self.assertEqual(4000, info.hits + info.misses)
+        self.assertLessEqual(info.currsize, 50)
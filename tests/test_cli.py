@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import errno
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from yepr.cli import LazyRecord, main
+
+
+class TestCli(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'in.jsonl')
+        with open(self.path, 'wb') as f:
+            f.write(b'{"a": 1}\n\n{"a": "x"}\n{"b": [1, 2]}')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_main(self, *argv):
+        out = io.BytesIO()
+        status = main(list(argv), stdout=out)
+        return status, out.getvalue()
+
+    def test_filter(self):
+        self.assertEqual((0, b'{"a": 1}\n{"a": "x"}\n{"b": [1, 2]}\n'), self.run_main('1 < 2', self.path))
+        self.assertEqual((0, b''), self.run_main('1 > 2', self.path))
+
+    def test_map(self):
+        self.assertEqual((0, b'"yes"\n"yes"\n"yes"\n'), self.run_main('-m', '1 < 2 ? yes : no', self.path))
+        self.assertEqual((0, b'1\n"x"\nnull\n'), self.run_main('-m', '$a', self.path))
+
+    def test_fields(self):
+        self.assertEqual((0, b'{"a": "x"}\n'), self.run_main('$a == x', self.path))
+        self.assertEqual((0, b'{"b": [1, 2]}\n'), self.run_main('-j', '2', '$b.1 == 2', self.path))
+
+    def test_jobs(self):
+        expected = self.run_main('--map', '#"abc"', self.path, self.path)
+        self.assertEqual(expected, self.run_main('--map', '-j', '2', '--chunk-size', '1', '#"abc"', self.path, self.path))
+        self.assertEqual(self.run_main('a', self.path), self.run_main('-j', '2', 'a', self.path))
+
+    def test_errors(self):
+        self.assertEqual(2, self.run_main('a <', self.path)[0])
+        self.assertEqual(1, self.run_main('#123', self.path)[0])
+
+        # the records before the failing one are written, with or without --jobs
+        expected = (1, b'{"a": 1}\n')
+        self.assertEqual(expected, self.run_main('$a < 2', self.path))
+        self.assertEqual(expected, self.run_main('-j', '2', '$a < 2', self.path))
+        self.assertEqual((1, b'true\n'), self.run_main('-j', '2', '-m', '$a < 2', self.path))
+
+    def test_broken_pipe(self):
+        class Closed(io.BytesIO):
+            def write(self, data):
+                raise IOError(errno.EPIPE, 'Broken pipe')
+
+        stderr = io.StringIO() if str is not bytes else io.BytesIO()
+        sys_stderr, sys.stderr = sys.stderr, stderr
+        try:
+            for argv in (['1 < 2'], ['-m', '$a'], ['-j', '2', '-m', '$a']):
+                self.assertEqual(0, main(argv + [self.path], stdout=Closed()))
+        finally:
+            sys.stderr = sys_stderr
+        self.assertEqual('', stderr.getvalue())
+
+
+class TestLazyRecord(TestCase):
+    def test_lazy(self):
+        record = LazyRecord(b'{"a": 1, "b": {"c": null}}')
+        self.assertIsNone(record._data)
+
+        self.assertEqual(1, record['a'])
+        self.assertEqual({'c': None}, record.get('b'))
+        self.assertIsNone(record.get('x'))
+        self.assertEqual(['a', 'b'], sorted(record))
+
+        with self.assertRaises(ValueError):
+            LazyRecord(b'[1]')['a']
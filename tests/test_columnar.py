@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from yepr import nodes
+from yepr.parser import Parser
+
+from . import Var
+
+
+def num(val):
+    return nodes.LiteralNumber(val)
+
+
+@skipIf(np is None, 'numpy is not installed')
+class TestExColumns(TestCase):
+    def setUp(self):
+        self.cols = {
+            'x': np.array([1, 5, 10, 0, 7]),
+            's': np.array(['abc', '', 'xbz', 'b', 'zzz']),
+        }
+
+    def assertSameAsRows(self, node, cols=None):
+        cols = cols or self.cols
+        got = node.ex_columns(cols)
+
+        names = list(cols)
+        for i, row in enumerate(zip(*[cols[k].tolist() for k in names])):
+            self.assertEqual(node.ex(dict(zip(names, row))), got[i], msg=i)
+
+        return got
+
+    def test_constant(self):
+        got = Parser(engine='fast').parse('a and b').ex_columns(self.cols)
+        self.assertEqual(['b'] * 5, got.tolist())
+
+        got = nodes.LiteralNull().ex_columns({}, size=3)
+        self.assertEqual([None] * 3, got.tolist())
+
+        with self.assertRaises(ValueError):
+            num('1').ex_columns({'a': [1, 2], 'b': [1]})
+
+    def test_compare(self):
+        x, s = nodes.Identifier('x'), nodes.Identifier('s')
+
+        for op in (
+            nodes.BinaryOp.LE, nodes.BinaryOp.LT, nodes.BinaryOp.GE, nodes.BinaryOp.GT,
+        ):
+            got = self.assertSameAsRows(nodes.BinaryExp(op, x, num('5')))
+            self.assertEqual(bool, got.dtype)
+
+        for op in (nodes.EqOp.EQ, nodes.EqOp.NE):
+            self.assertSameAsRows(nodes.EqExp(op, x, num('7')))
+
+        for op in (nodes.BinaryOp.IN, nodes.BinaryOp.NOTIN):
+            self.assertSameAsRows(nodes.BinaryExp(op, nodes.LiteralString('b'), s))
+
+        for op in (nodes.EqOp.RE, nodes.EqOp.NR):
+            self.assertSameAsRows(nodes.EqExp(op, s, nodes.LiteralString('^.b')))
+
+    def test_unary(self):
+        x, s = nodes.Identifier('x'), nodes.Identifier('s')
+
+        self.assertSameAsRows(nodes.UnaryExp(nodes.UnaryOp.MINUS, x))
+        self.assertSameAsRows(nodes.UnaryExp(nodes.UnaryOp.NOT, x))
+        self.assertSameAsRows(nodes.UnaryExp(nodes.UnaryOp.NOT, s))
+        self.assertSameAsRows(nodes.UnaryExp(nodes.UnaryOp.HASH, s))
+
+    def test_logic(self):
+        x, s = nodes.Identifier('x'), nodes.Identifier('s')
+
+        self.assertSameAsRows(nodes.LogicAndExp(nodes.LogicOp.AND, x, s))
+        self.assertSameAsRows(nodes.LogicOrExp(nodes.LogicOp.OR, s, x))
+        self.assertSameAsRows(nodes.CondExp(s, x, num('-1')))
+        self.assertSameAsRows(nodes.CondExp(
+            nodes.BinaryExp(nodes.BinaryOp.GT, x, num('3')),
+            nodes.LiteralString('big'),
+            nodes.LiteralString('small'),
+        ))
+
+    def test_short_circuit(self):
+        seen = []
+        big = nodes.BinaryExp(nodes.BinaryOp.GT, Var('x'), num('4'))
+
+        node = nodes.LogicAndExp(nodes.LogicOp.AND, big, Var('s', seen))
+        self.assertSameAsRows(node)
+        del seen[:]
+        node.ex_columns(self.cols)
+        self.assertEqual(['', 'xbz', 'zzz'], seen)
+
+        del seen[:]
+        nodes.LogicOrExp(nodes.LogicOp.OR, big, Var('s', seen)).ex_columns(self.cols)
+        self.assertEqual(['abc', 'b'], seen)
+
+        del seen[:]
+        nodes.CondExp(big, Var('s', seen), num('0')).ex_columns(self.cols)
+        self.assertEqual(['', 'xbz', 'zzz'], seen)
+
+    def test_bools(self):
+        # True == 1: the types must match too
+        parser = Parser(engine='fast')
+        for expr in ('$b ? $b : 1', '$b or 2', '-$b', '+$b', '$b and 0'):
+            node = parser.parse(expr)
+            rows = [node.ex({'b': b}) for b in (True, False)]
+            got = node.ex_columns({'b': np.array([True, False])}).tolist()
+            self.assertEqual([(type(v), v) for v in rows], [(type(v), v) for v in got], msg=expr)
+
+    def test_identifier(self):
+        parser = Parser(engine='fast')
+        for expr in ('$x > 4 and $s', '$s or $missing', '#$s < $x'):
+            self.assertSameAsRows(parser.parse(expr))
+
+        cols = {'u': np.array([{'geo': {'cc': 'fr'}}, {'geo': None}, {}], dtype=object)}
+        got = self.assertSameAsRows(parser.parse('$u.geo.cc == "fr"'), cols)
+        self.assertEqual([True, False, False], got.tolist())
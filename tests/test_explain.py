@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+
+from yepr import nodes
+from yepr.explain import Profiler
+from yepr.parser import Parser
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        # x > 3 and "b" in "abc" ? "big" : "small"
+        self.node = nodes.CondExp(
+            nodes.LogicAndExp(
+                nodes.LogicOp.AND,
+                nodes.BinaryExp(nodes.BinaryOp.GT, nodes.Identifier('x'), nodes.LiteralNumber('3')),
+                nodes.BinaryExp(nodes.BinaryOp.IN, nodes.LiteralString('b'), nodes.LiteralString('abc')),
+            ),
+            nodes.LiteralString('big'),
+            nodes.LiteralString('small'),
+        )
+
+    def test_ex(self):
+        prof = Profiler(self.node)
+        for x in range(6):
+            self.assertEqual(self.node.ex({'x': x}), prof.ex({'x': x}))
+
+    def test_ast(self):
+        prof = Profiler(self.node)
+        for x in range(6):
+            prof.ex({'x': x})
+
+        ast = prof.ast()
+
+        # same shape as the plain ast(), plus the stats
+        def strip(ast):
+            return dict(
+                (k, strip(v) if isinstance(v, dict) else v)
+                for k, v in ast.items() if k != '$profile'
+            )
+        self.assertEqual(self.node.ast(), strip(ast))
+
+        def counts(ast):
+            return ast['$profile']['calls'], ast['$profile']['skipped']
+
+        self.assertEqual((6, 0), counts(ast))
+        self.assertEqual((6, 0), counts(ast['cond']))
+        self.assertEqual((6, 0), counts(ast['cond']['l']))
+        self.assertEqual((2, 4), counts(ast['cond']['r']))
+        self.assertEqual((2, 0), counts(ast['cond']['r']['l']))
+        self.assertEqual((2, 4), counts(ast['true']))
+        self.assertEqual((4, 2), counts(ast['false']))
+
+        profile = ast['$profile']
+        self.assertGreaterEqual(profile['total'], profile['self'])
+        self.assertGreaterEqual(profile['self'], 0)
+
+    def test_collapsed(self):
+        prof = Profiler(Parser(engine='fast').parse('a and b'))
+        prof.ex({})
+
+        frames = [line.rsplit(' ', 1)[0] for line in prof.collapsed().splitlines()]
+        self.assertEqual([
+            'LogicAndExp(&&)',
+            'LogicAndExp(&&);LiteralString',
+            'LogicAndExp(&&);LiteralString',
+        ], frames)
+
+    def test_error(self):
+        prof = Profiler(self.node)
+        with self.assertRaises(TypeError):
+            prof.ex({})     # None > 3
+
+        ast = prof.ast()
+        self.assertEqual(1, ast['$profile']['calls'])
+        # not reached because of the error, not short-circuited
+        self.assertEqual(0, ast['cond']['r']['$profile']['skipped'])
+
+    def test_regex(self):
+        # evaluated through the probe on `r`, not a pattern compiled before
+        prof = Profiler(Parser(engine='fast').parse('$s =~ "^a"'))
+        self.assertEqual([True, False], [prof.ex({'s': s}) for s in ('ab', 'ba')])
+
+        ast = prof.ast()
+        self.assertEqual((2, 0), (ast['r']['$profile']['calls'], ast['r']['$profile']['skipped']))
+
+    def test_chain(self):
+        node = Parser(engine='fast').parse('$a and $b and $c')
+        prof = Profiler(node)
+        for a in (0, 1, 1):
+            prof.ex({'a': a, 'b': 1, 'c': 1})
+
+        ast = prof.ast()
+        self.assertEqual((3, 0), (ast['$profile']['calls'], ast['$profile']['skipped']))
+        self.assertEqual((3, 0), (ast['l']['$profile']['calls'], ast['l']['$profile']['skipped']))
+        self.assertEqual((2, 1), (ast['l']['r']['$profile']['calls'], ast['l']['r']['$profile']['skipped']))
+        self.assertEqual((2, 1), (ast['r']['$profile']['calls'], ast['r']['$profile']['skipped']))
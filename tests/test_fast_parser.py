@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import random
+import re
+
+from grako.exceptions import FailedParse
+
+from yepr.parser import Parser
+from yepr.fast_parser import FastParser, ParseError, tokenize
+
+
+# one or more samples for every rule and alternative in grammar/yep.grako
+VALID = [
+    # constant / simple_string / quoted_string / number
+    'a', '_', 'a-b', 'a.b.c', 'a_1_b', 'nota', 'not_a', 'income', 'isa_x', 'order',
+    '123', '0', '"abc"', "'abc'", '""', "''", r'"a\"b"', r"'a\'b'", '"a b \'c\'"',
+    '  a  ', '\ta\n',
+    # identifier
+    '$a', '$a.b.c', '$_x.0.y', '$in', ' $a ', '$a==$b', '-$a', '#$a',
+    # primary_expression
+    '(a)', '((a))', '( a )',
+    # unary_expression / OP_UNARY
+    '!a', 'not a', 'not(a)', '+1', '-1', '- -1', '#"abc"', '#abc', '!!a', 'not not a', '-(a)',
+    # relational_expression / OP_BINARY
+    'a <= b', 'a le b', 'a<b', 'a lt b', 'a >= b', 'a ge b', 'a > b', 'a gt b',
+    'a in b', 'a in(b)', 'a not in b', 'a not  in b', 'a not \tin b', 'a in b in c',
+    'a le(b)', '1<2<3',
+    # equality_expression / OP_EQ
+    'a == b', 'a eq b', 'a != b', 'a ne b', 'a =~ b', 'a !~ b', 'a isa b',
+    'a is not b', 'a is  not b', 'a is \tnot b', 'a is b', 'a is\tnot b',
+    'a is notb', 'a==b==c', 'a < b == c > d',
+    # logical_and_expression / logical_or_expression
+    'a and b', 'a && b', 'a or b', 'a || b', 'a and b or c', 'a or b and c',
+    'a and b and c', 'a\nand b', 'a and(b)', 'a and not b', 'a||b&&c',
+    # conditional_expression
+    'x ? y : z', 'a ? b ? c : d : e', 'a ? b : c ? d : e', 'a or b ? c : d',
+    '(a ? b : c) ? d : e', 'a?b:c',
+    # regex
+    '/a/', r'/^a\/b$/i', '/ a b /msx', r'/\d+/m', '$a =~ /x/', 'a !~ /x/s', '/a/ and /b/',
+    # mixed
+    'not a == b', '#name >= 3 and name =~ "^\\\\w+$" or name in "abc"',
+    '-1 < +2 and !(a is not b) ? "yes" : \'no\'',
+]
+
+INVALID = [
+    '', ' ', 'true', 'false', 'null', 'in.x', 'do-x', 'a and_b', 'a andb', 'a.', '1.5',
+    'a notin b', 'a isnot b', 'not in', 'a not in', 'a or1', 'a1', '(a', 'a)', 'a ?',
+    'a ? b', 'a ? b :', 'a ? b ? c : d', 'a - b', '!= a', 'a ==', '"abc', 'é', 'a < < b',
+    'a b', '1a', '(', ')', '?', ':', '!', 'not', '- ', 'a :',
+    '$', '$ a', '$a.', '$1', '$a..b', '$$a', 'a$b', '$a b', '$a.-b', '$a.b-c',
+    '//', '/a', '/a/q', '/a/ia', '/a/iand b', '/(/', '/a\n/', '/[/]/',
+]
+
+
+class TestConformance(TestCase):
+    def setUp(self):
+        self.grako = Parser(cache_size=0)
+        self.fast = Parser(cache_size=0, engine='fast')
+
+    def assertConforms(self, expr):
+        try:
+            expected = self.grako.parse(expr)
+        except (FailedParse, re.error):    # invalid input, not any failure of grako
+            with self.assertRaises(ParseError, msg=repr(expr)):
+                self.fast.parse(expr)
+        else:
+            self.assertEqual(expected.ast(), self.fast.parse(expr).ast(), msg=repr(expr))
+
+    def test_valid(self):
+        for expr in VALID:
+            self.grako.parse(expr)
+            self.assertConforms(expr)
+
+    def test_invalid(self):
+        for expr in INVALID:
+            self.assertConforms(expr)
+
+    def test_random(self):
+        rnd = random.Random(20151213)
+
+        operands = ['a', 'b-c', 'x.y', 'nota', '12', '"s"', "'q'", '_', '$v', '$u.geo.0']
+        unary = ['!', 'not ', '+', '-', '#', '- ']
+        binary = [
+            '<=', ' le ', '<', ' lt ', '>=', ' ge ', '>', ' gt ', ' in ', ' not in ',
+            '==', ' eq ', '!=', ' ne ', '=~', '!~', ' isa ', ' is not ', ' is ',
+            ' and ', '&&', ' or ', '||',
+        ]
+        spaces = ['', ' ', '  ', '\t', '\n']
+
+        def gen(depth):
+            r = rnd.random()
+            if depth <= 0 or r < 0.3:
+                node = rnd.choice(operands)
+            elif r < 0.45:
+                node = rnd.choice(unary) + gen(depth - 1)
+            elif r < 0.55:
+                node = '(' + gen(depth - 1) + ')'
+            elif r < 0.65:
+                node = gen(depth - 1) + ' ? ' + gen(depth - 1) + ' : ' + gen(depth - 1)
+            else:
+                node = gen(depth - 1) + rnd.choice(binary) + gen(depth - 1)
+            return rnd.choice(spaces) + node + rnd.choice(spaces)
+
+        for _ in range(200):
+            expr = gen(4)
+            if rnd.random() < 0.1:
+                # random damage to cover the error paths as well
+                i = rnd.randrange(len(expr) + 1)
+                expr = expr[:i] + rnd.choice(['(', ')', '?', ':', '!', '=', 'in', '.', '$']) + expr[i:]
+            self.assertConforms(expr)
+
+
+class TestFastParser(TestCase):
+    def test_tokenize(self):
+        kinds = [kind for kind, _, _ in tokenize('a not  in (b) ? -1 : "c"')]
+        self.assertEqual(11, len(kinds))
+
+    def test_error(self):
+        with self.assertRaisesRegexp(ParseError, r'expecting end of text at 2'):
+            FastParser().parse('a b')
+
+    def test_ex(self):
+        parser = Parser(engine='fast')
+        self.assertEqual(parser.parse_and_ex('a and b or c', {}), 'b')
+        self.assertEqual(parser.parse_and_ex('#abc == 3 ? "x" : "y"', {}), 'x')
+
+    def test_engine(self):
+        with self.assertRaises(ValueError):
+            Parser(engine='yacc')
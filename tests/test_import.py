@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase, skipIf
+import os
+import subprocess
+import sys
+
+
+# microseconds for `import yepr.serialize`, yepr.nodes included; it takes
+# about 30ms here, the slack is for slow CI machines
+IMPORT_BUDGET = 150000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, *options):
+    return subprocess.check_output(
+        [sys.executable] + list(options) + ['-c', code],
+        cwd=ROOT, stderr=subprocess.STDOUT,
+    ).decode('utf-8')
+
+
+def loaded(code):
+    """Top-level packages among grako and future imported by running `code`."""
+    out = run(code + '\nimport sys\n'
+              'print(" ".join(sorted(set(m.split(".")[0] for m in sys.modules) & set(["grako", "future"]))))')
+    return out.split()
+
+
+class TestImport(TestCase):
+    def test_evaluation_only(self):
+        self.assertEqual([], loaded(
+            'import yepr.serialize, yepr.ruleset, yepr.index\n'
+            'from yepr.parser import Parser\n'
+            'tree = Parser(engine="fast").parse("$a > 1 and b")\n'
+            'yepr.serialize.loads(yepr.serialize.dumps([("r", "$a > 1 and b", tree)])).node(0).compile()({"a": 2})'
+        ))
+
+    def test_grako_on_first_parse(self):
+        self.assertEqual([], loaded('from yepr.parser import Parser\nparser = Parser()'))
+        self.assertIn('grako', loaded('from yepr.parser import Parser\nParser().parse("a and b")'))
+
+    @skipIf(sys.version_info < (3, 7), '-X importtime is python 3.7+')
+    def test_budget(self):
+        out = run('import yepr.serialize', '-X', 'importtime')
+
+        # import time: self [us] | cumulative | imported package
+        times = {}
+        for line in out.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line.split('|')
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative)
+
+        self.assertLess(times['yepr.serialize'], IMPORT_BUDGET)
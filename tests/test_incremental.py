@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+
+from yepr import nodes
+from yepr.incremental import Incremental
+from yepr.parser import Parser
+
+from . import Var
+
+
+class TestIncremental(TestCase):
+    def setUp(self):
+        self.parser = Parser(cache_size=0, engine='fast')
+
+    def live(self, rules, ctx):
+        return Incremental(rules, ctx, parser=self.parser)
+
+    def test_values(self):
+        live = self.live({
+            'admin': '$user.role == "admin"',
+            'big': '#$cart > 2',
+            'both': '$user.role == "admin" and #$cart > 2',
+        }, {'user': {'role': 'admin'}, 'cart': [1, 2, 3]})
+
+        self.assertEqual({'admin': True, 'big': True, 'both': True}, live.values)
+        self.assertEqual({'big': False, 'both': False}, live.update('cart', []))
+        self.assertEqual({}, live.update('cart', [1]))
+        self.assertEqual({'admin': False}, live.update('user', {'role': 'guest'}))
+        self.assertEqual({'big': True}, live.update('cart', [1, 2, 3]))
+        self.assertEqual({'admin': True, 'both': True}, live.update('user', {'role': 'admin'}))
+        self.assertEqual({'admin': False, 'both': False}, live.delete('user'))
+
+    def test_only_affected(self):
+        fields = ['a', 'b', 'c']
+        rules = [(f, nodes.EqExp(nodes.EqOp.EQ, nodes.Identifier(f), nodes.LiteralNumber(1))) for f in fields]
+        live = self.live(rules, dict((f, 0) for f in fields))
+
+        seen = []
+        ex = live._ex
+        live._ex = lambda node: (id(node) not in live._memo and seen.append(node)) or ex(node)
+
+        self.assertEqual({'b': True}, live.update('b', 1))
+        self.assertEqual([rules[1][1], rules[1][1].l], seen)
+
+    def test_shared_memo(self):
+        tree = self.parser.parse('$a > 1 and $b > 1')
+        live = self.live([('x', tree), ('y', nodes.UnaryExp(nodes.UnaryOp.NOT, tree))], {'a': 2, 'b': 2})
+        self.assertEqual({'x': True, 'y': False}, live.values)
+
+        seen = []
+        ex = live._ex
+        live._ex = lambda node: (id(node) not in live._memo and seen.append(node)) or ex(node)
+
+        self.assertEqual({'x': False, 'y': True}, live.update('b', 0))
+        # `$a > 1` answers from memory, `$b > 1` and the and are evaluated once
+        self.assertEqual(1, sum(1 for node in seen if node == tree))
+        self.assertEqual(1, sum(1 for node in seen if node == tree.r))
+        self.assertEqual([], [node for node in seen if node == tree.l])
+
+    def test_short_circuit(self):
+        live = self.live({'long': '$s and #$s > 3'}, {'s': None})
+        self.assertEqual({'long': None}, live.values)
+        self.assertEqual({'long': True}, live.update('s', 'abcd'))
+
+    def test_opaque(self):
+        var = Var('x')
+        live = self.live([('x', var), ('y', self.parser.parse('$y'))], {'x': 1, 'y': 2})
+        self.assertEqual(1, var.calls)
+
+        self.assertEqual({'y': 3}, live.update('y', 3))
+        self.assertEqual(2, var.calls)
+        self.assertEqual({'x': 5}, live.update('x', 5))
+
+    def test_error_retried(self):
+        live = self.live({'n': '#$s'}, {'s': 'ab'})
+        with self.assertRaises(TypeError):
+            live.update('s', 1)
+        with self.assertRaises(TypeError):
+            live.update('other', 0)     # still pending
+
+        self.assertEqual({'n': 2}, live.values)
+        self.assertEqual({'n': 3}, live.update('s', 'abc'))
+
+    def test_error_keeps_changes(self):
+        live = self.live([('a', '$x == 3'), ('b', '$x > 1 and $x < $y')], {'x': 0, 'y': 's'})
+        self.assertEqual({'a': False, 'b': False}, live.values)
+
+        # `a` changes, then `b` raises: the change is reported once `b` evaluates
+        with self.assertRaises(TypeError):
+            live.update('x', 3)
+        self.assertEqual({'a': True, 'b': False}, live.values)
+
+        self.assertEqual({'a': True, 'b': True}, live.update('y', 5))
+        self.assertEqual({}, live.update('y', 6))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+
+from yepr import nodes
+from yepr.index import RuleIndex, constraint, conjuncts
+
+
+def eq(key, val):
+    lit = nodes.LiteralNumber(val) if isinstance(val, int) else nodes.LiteralString(val)
+    return nodes.EqExp(nodes.EqOp.EQ, key, lit)
+
+
+def and_(*exps):
+    node = exps[0]
+    for exp in exps[1:]:
+        node = nodes.LogicAndExp(nodes.LogicOp.AND, node, exp)
+    return node
+
+
+def or_(l, r):
+    return nodes.LogicOrExp(nodes.LogicOp.OR, l, r)
+
+
+class TestConstraint(TestCase):
+    def test_extract(self):
+        region, tier = nodes.Identifier('region'), nodes.Identifier('tier')
+
+        self.assertEqual((region, frozenset(['eu'])), constraint(eq(region, 'eu')))
+        self.assertEqual((tier, frozenset([2])), constraint(nodes.EqExp(nodes.EqOp.EQ, nodes.LiteralNumber('2'), tier)))
+        self.assertEqual((region, frozenset(['eu', 'us'])), constraint(or_(eq(region, 'eu'), eq(nodes.Identifier('region'), 'us'))))
+        self.assertEqual(
+            (region, frozenset(['', 'a', 'b', 'ab'])),
+            constraint(nodes.BinaryExp(nodes.BinaryOp.IN, region, nodes.LiteralString('ab'))),
+        )
+
+        for node in (
+            or_(eq(region, 'eu'), eq(tier, 1)),
+            nodes.EqExp(nodes.EqOp.NE, region, nodes.LiteralString('eu')),
+            nodes.EqExp(nodes.EqOp.EQ, region, tier),
+            nodes.BinaryExp(nodes.BinaryOp.IN, nodes.LiteralString('eu'), region),
+            nodes.BinaryExp(nodes.BinaryOp.GE, tier, nodes.LiteralNumber('2')),
+            region,
+        ):
+            self.assertIsNone(constraint(node))
+
+    def test_conjuncts(self):
+        a, b, c = nodes.Identifier('a'), nodes.Identifier('b'), nodes.Identifier('c')
+        self.assertEqual([a, b, c], conjuncts(and_(a, b, c)))
+        self.assertEqual([a, b, c], conjuncts(nodes.LogicAndExp(nodes.LogicOp.AND, a, and_(b, c))))
+        self.assertEqual([a], conjuncts(a))
+
+
+class TestRuleIndex(TestCase):
+    def setUp(self):
+        region, tier, plan = nodes.Identifier('region'), nodes.Identifier('tier'), nodes.Identifier('plan')
+        self.index = RuleIndex([
+            ('eu', and_(eq(region, 'eu'), nodes.BinaryExp(nodes.BinaryOp.GE, tier, nodes.LiteralNumber('2')))),
+            ('us_paid', and_(eq(nodes.Identifier('region'), 'us'), or_(eq(plan, 'pro'), eq(nodes.Identifier('plan'), 'team')))),
+            ('tier_1', eq(tier, 1)),
+            ('short', nodes.BinaryExp(nodes.BinaryOp.IN, plan, nodes.LiteralString('free pro'))),
+            ('scan', nodes.BinaryExp(nodes.BinaryOp.LT, tier, nodes.LiteralNumber('3'))),
+        ])
+
+    def test_info(self):
+        self.assertEqual({'rules': 5, 'keys': 3, 'indexed': 4, 'scan': 1}, self.index.info())
+
+    def test_candidates(self):
+        index = self.index
+        self.assertEqual([0, 4], index.candidates({'region': 'eu', 'tier': 3, 'plan': 'x'}))
+        self.assertEqual([1, 3, 4], index.candidates({'region': 'us', 'tier': 3, 'plan': 'pro'}))
+        self.assertEqual([2, 4], index.candidates({'region': 'fr', 'tier': 1.0, 'plan': 'team'}))
+
+        # unhashable values: every rule on that key is a candidate
+        self.assertEqual([0, 1, 2, 4], index.candidates({'region': [], 'tier': [], 'plan': 'x'}))
+
+    def test_match(self):
+        index = self.index
+        for ctx in (
+            {'region': 'eu', 'tier': 2, 'plan': 'free'},
+            {'region': 'eu', 'tier': 1, 'plan': 'pro'},
+            {'region': 'us', 'tier': 3, 'plan': 'team'},
+            {'region': 'us', 'tier': 5, 'plan': 'free'},
+            {'region': 'fr', 'tier': True, 'plan': 'e p'},
+        ):
+            expected = [name for name, fn in zip(index.names, index._fns) if fn(ctx)]
+            self.assertEqual(expected, index.match(ctx), msg=ctx)
+
+    def test_text(self):
+        index = RuleIndex({'a': '1 < 2'})
+        self.assertEqual(['a'], index.match({}))
+        self.assertEqual({'a': True}, index.ex({}))
@@ -4,8 +4,12 @@ from builtins import str
 
 from unittest import TestCase
 from collections import namedtuple
+import re
 
 from yepr import nodes
+from yepr.parser import Parser
+
+from . import Var
 
 
 class TestToken(TestCase):
@@ -132,6 +136,71 @@ class TestExpr(TestCase):
             ).ex({})
         )
 
+    def test_eq_exp_regex(self):
+        re_op = nodes.EqExp(
+            nodes.EqOp.RE,
+            nodes.LiteralString('abc'),
+            nodes.LiteralString(r'^\w+$'),
+        )
+        self.assertIsNotNone(re_op.pat)
+        self.assertIs(True, re_op.ex({}))
+        self.assertIs(True, re_op.compile()({}))
+
+        nr_op = nodes.EqExp(
+            nodes.EqOp.NR,
+            nodes.LiteralString('abc'),
+            nodes.LiteralString(r'^\w+$'),
+        )
+        self.assertIs(False, nr_op.ex({}))
+        self.assertIs(False, nr_op.compile()({}))
+
+        # the pattern follows `r` when the children are replaced
+        digits = re_op.with_children([nodes.LiteralString('abc'), nodes.LiteralString(r'^\d+$')])
+        self.assertEqual(r'^\d+$', digits.pat.pattern)
+        self.assertIs(False, digits.ex({}))
+        self.assertIsNotNone(re_op.with_children(re_op.children()).pat)
+
+        # an invalid literal pattern still fails when evaluated, not when built
+        bad = nodes.EqExp(nodes.EqOp.RE, nodes.LiteralString('a'), nodes.LiteralString('('))
+        self.assertIsNone(bad.pat)
+        with self.assertRaises(re.error):
+            bad.ex({})
+
+    def test_literal_regex(self):
+        node = nodes.LiteralRegex(r'^a\.b$', 'im')
+        self.assertEqual(re.compile(r'^a\.b$', re.I | re.M), node.ex({}))
+        self.assertEqual(nodes.LiteralRegex(r'^a\.b$', 'im'), node)
+        self.assertNotEqual(nodes.LiteralRegex(r'^a\.b$', 'i'), node)
+        self.assertRegexpMatches(str(node), r'<LiteralRegex at 0x[\da-f]+> /\^a\\\.b\$/im')
+
+        # compiled once, when the tree is built
+        test = Parser(engine='fast').parse('$x =~ /^A\\/b/i')
+        self.assertIs(test.r.val, test.pat)
+        self.assertIs(True, test.ex({'x': 'a/b'}))
+        self.assertIs(False, test.compile()({'x': 'b/a'}))
+
+        with self.assertRaises(ValueError):
+            nodes.LiteralRegex('a', 'q')
+        with self.assertRaises(re.error):
+            nodes.LiteralRegex('(')
+
+    def test_regex_cache(self):
+        class Pattern(nodes.Node):
+            def ex(self, ctx):
+                return ctx['pat']
+
+        node = nodes.EqExp(nodes.EqOp.RE, nodes.LiteralString('abc'), Pattern())
+        self.assertIsNone(node.pat)
+
+        nodes.regex_cache.clear()
+        self.assertIs(True, node.ex({'pat': '^a'}))
+        self.assertIs(True, node.ex({'pat': '^a'}))
+        self.assertIs(False, node.compile()({'pat': '^b'}))
+
+        info = nodes.regex_cache.info()
+        self.assertEqual((1, 2), (info.hits, info.misses))
+        self.assertEqual(2, info.currsize)
+
     def test_or_exp(self):
         self.assertEqual(
             123,
@@ -222,6 +291,283 @@ class TestExpr(TestCase):
         )
 
 
+class TestCompile(TestCase):
+    def assertSameAsEx(self, node, ctx=None):
+        ctx = ctx or {}
+        self.assertEqual(node.ex(ctx), node.compile()(ctx))
+
+    def test_literal(self):
+        self.assertSameAsEx(nodes.LiteralTrue())
+        self.assertSameAsEx(nodes.LiteralNull())
+        self.assertSameAsEx(nodes.LiteralString('abc'))
+        self.assertSameAsEx(nodes.LiteralNumber('123.5'))
+
+    def test_ops(self):
+        n123, n456 = nodes.LiteralNumber('123'), nodes.LiteralNumber('456')
+        abc = nodes.LiteralString('abc')
+
+        for op in (nodes.UnaryOp.NOT, nodes.UnaryOp.PLUS, nodes.UnaryOp.MINUS):
+            self.assertSameAsEx(nodes.UnaryExp(op, n123))
+        self.assertSameAsEx(nodes.UnaryExp(nodes.UnaryOp.HASH, abc))
+
+        for op in (
+            nodes.BinaryOp.LE, nodes.BinaryOp.LT,
+            nodes.BinaryOp.GE, nodes.BinaryOp.GT,
+        ):
+            self.assertSameAsEx(nodes.BinaryExp(op, n123, n456))
+            self.assertSameAsEx(nodes.BinaryExp(op, n456, nodes.UnaryExp(nodes.UnaryOp.MINUS, n123)))
+
+        for op in (nodes.BinaryOp.IN, nodes.BinaryOp.NOTIN):
+            self.assertSameAsEx(nodes.BinaryExp(op, nodes.LiteralString('b'), abc))
+
+        for op in (nodes.EqOp.EQ, nodes.EqOp.NE, nodes.EqOp.IS, nodes.EqOp.ISNOT):
+            self.assertSameAsEx(nodes.EqExp(op, n123, n123))
+
+        for op in (nodes.EqOp.RE, nodes.EqOp.NR):
+            self.assertSameAsEx(nodes.EqExp(op, abc, nodes.LiteralString(r'^\w+$')))
+
+    def test_logic(self):
+        zero, n456 = nodes.LiteralNumber('0'), nodes.LiteralNumber('456')
+
+        for l in (zero, n456):
+            self.assertSameAsEx(nodes.LogicOrExp(nodes.LogicOp.OR, l, n456))
+            self.assertSameAsEx(nodes.LogicAndExp(nodes.LogicOp.AND, l, n456))
+            self.assertSameAsEx(nodes.CondExp(l, nodes.LiteralTrue(), nodes.LiteralFalse()))
+
+    def test_fallback(self):
+        node = nodes.BinaryExp(nodes.BinaryOp.LT, Var(), nodes.LiteralNumber('10'))
+        self.assertIs(True, node.compile()({'x': 3}))
+        self.assertIs(False, node.compile()({'x': 30}))
+
+
+class TestSpecialize(TestCase):
+    def setUp(self):
+        self.parser = Parser(engine='fast')
+
+    def specialize(self, expr):
+        return self.parser.parse(expr).specialize({})
+
+    def test_fold(self):
+        for expr, cls, val in (
+            ('123', nodes.LiteralNumber, 123),
+            ('-123', nodes.LiteralNumber, -123),
+            ('not a', nodes.LiteralFalse, False),
+            ('#"abc"', nodes.LiteralNumber, 3),
+            ('"a" in "abc"', nodes.LiteralTrue, True),
+            ('a == a and 1 < 2', nodes.LiteralTrue, True),
+            ('1 > 2 ? x : y', nodes.LiteralString, 'y'),
+            ('a and b or c', nodes.LiteralString, 'b'),
+        ):
+            node = self.specialize(expr)
+            self.assertIsInstance(node, cls, msg=expr)
+            self.assertEqual(val, node.ex({}), msg=expr)
+
+    def test_fold_errors_are_kept(self):
+        node = self.specialize('#123 or a')
+        self.assertIsInstance(node, nodes.LogicOrExp)
+        self.assertIsInstance(node.l, nodes.UnaryExp)
+
+        with self.assertRaises(TypeError):
+            node.ex({})
+
+    def test_residual(self):
+        var = Var()
+        true = self.parser.parse('1 < 2')
+
+        node = nodes.LogicAndExp(nodes.LogicOp.AND, true, var).specialize()
+        self.assertIs(var, node)
+
+        node = nodes.LogicOrExp(nodes.LogicOp.OR, nodes.UnaryExp(nodes.UnaryOp.NOT, true), var).specialize()
+        self.assertIs(var, node)
+
+        node = nodes.CondExp(var, true, nodes.LiteralNumber('0')).specialize()
+        self.assertIsInstance(node, nodes.CondExp)
+        self.assertIsInstance(node.yes, nodes.LiteralTrue)
+        self.assertEqual(True, node.ex({'x': 1}))
+        self.assertEqual(0, node.ex({'x': 0}))
+
+        # nothing to fold: the very same tree comes back
+        node = nodes.EqExp(nodes.EqOp.EQ, var, nodes.LiteralString('a'))
+        self.assertIs(node, node.specialize())
+
+        node = nodes.EqExp(nodes.EqOp.RE, var, self.parser.parse('a ? "^x" : "^y"')).specialize()
+        self.assertIsNotNone(node.pat)
+        self.assertIs(True, node.ex({'x': 'xyz'}))
+
+
+class TestNary(TestCase):
+    def setUp(self):
+        self.parser = Parser(cache_size=0, engine='fast')
+
+    def chain(self, n, op='or'):
+        return ' {} '.format(op).join('$k{} == {}'.format(i, i) for i in range(n))
+
+    def test_flat(self):
+        for engine in ('fast', 'grako'):
+            node = Parser(cache_size=0, engine=engine).parse('a or b or c || d')
+            self.assertIsInstance(node, nodes.LogicOrExp)
+            self.assertEqual(['a', 'b', 'c', 'd'], [n.val for n in node.operands], msg=engine)
+
+        # `l`/`r` and ast() still read as the left-folded binary tree
+        node = self.parser.parse('a and b and c')
+        self.assertEqual(['a', 'b'], [n.val for n in node.l.operands])
+        self.assertEqual('c', node.r.val)
+        self.assertEqual({
+            '$type': 'LogicAndExp',
+            '$op': '<LogicOp(&&)>',
+            'l': {
+                '$type': 'LogicAndExp',
+                '$op': '<LogicOp(&&)>',
+                'l': {'$type': 'LiteralString', 'val': 'a'},
+                'r': {'$type': 'LiteralString', 'val': 'b'},
+            },
+            'r': {'$type': 'LiteralString', 'val': 'c'},
+        }, node.ast())
+
+        # a group on the right is an operand of its own
+        node = self.parser.parse('a and (b and c)')
+        self.assertEqual(2, len(node.operands))
+        self.assertEqual(node.ast(), nodes.from_ast(node.ast()).ast())
+        self.assertEqual(3, len(self.parser.parse('(a and b) and c').operands))
+
+    def test_ex(self):
+        node = self.parser.parse('"" or 0 or x or y')
+        for fn in (node.ex, node.compile(), node.ex_iterative):
+            self.assertEqual('x', fn({}))
+
+        node = self.parser.parse('a and "" and x')
+        for fn in (node.ex, node.compile(), node.ex_iterative):
+            self.assertEqual('', fn({}))
+
+    def test_specialize(self):
+        var = nodes.Identifier('x')
+        or_ = lambda *operands: nodes.LogicOrExp(nodes.LogicOp.OR, *operands)
+
+        node = or_(var, self.parser.parse('0'), nodes.Identifier('y')).specialize()
+        self.assertEqual(['x', 'y'], [n.name for n in node.operands])
+
+        node = or_(var, self.parser.parse('1'), nodes.Identifier('y')).specialize()
+        self.assertEqual([var, nodes.LiteralNumber('1')], list(node.operands))
+
+        self.assertEqual(0, or_(self.parser.parse('""'), self.parser.parse('0')).specialize().ex({}))
+
+    def test_long_chain(self):
+        expr = self.chain(5000)
+        node = self.parser.parse(expr)
+        self.assertEqual(5000, len(node.operands))
+
+        ctx = {'k4999': 4999}
+        self.assertIs(True, node.ex(ctx))
+        self.assertIs(True, node.compile()(ctx))
+        self.assertIs(False, node.ex({}))
+        self.assertEqual(node, nodes.from_ast(node.ast()))
+
+    def test_deep(self):
+        node = nodes.Identifier('x')
+        for i in range(20000):
+            node = nodes.UnaryExp(nodes.UnaryOp.NOT, node) if i % 2 else nodes.CondExp(
+                node, nodes.LiteralTrue(), nodes.LiteralFalse())
+
+        with self.assertRaises(RuntimeError):   # RecursionError
+            node.ex({'x': 1})
+        self.assertIs(True, node.ex_iterative({'x': 1}))
+        self.assertIs(False, node.ex_iterative({'x': 0}))
+
+    def test_iterative(self):
+        ctx = {'a': 'abc', 'n': 3}
+        for expr in (
+            'abc', '-$n', '#$a > 2', '$a =~ "^a" and not ($a !~ "c$")', '$a in "xabcx" ? $n : 0',
+            '$n == 3 or $nope.x', 'b in $a && $a is not "x"', '$a.0 == a',
+        ):
+            node = self.parser.parse(expr)
+            self.assertEqual(node.ex(ctx), node.ex_iterative(ctx), msg=expr)
+
+        with self.assertRaises(TypeError):
+            self.parser.parse('#$n').ex_iterative(ctx)
+
+
+class TestIdentifier(TestCase):
+    def setUp(self):
+        self.parser = Parser(engine='fast')
+
+    def test_ex(self):
+        Geo = namedtuple('Geo', 'cc')
+        ctx = {
+            'a': 1,
+            'user': {'geo': Geo('fr'), 'tags': ['x', 'y'], '0': 'zero', 'none': None},
+        }
+
+        for expr, val in (
+            ('$a', 1),
+            ('$user.geo.cc', 'fr'),
+            ('$user.tags.1', 'y'),
+            ('$user.0', 'zero'),
+            ('$missing', None),
+            ('$user.tags.5', None),
+            ('$user.none.x', None),
+            ('$a.b.c', None),
+            ('$user.geo.cc == "fr" and #$user.tags', 2),
+        ):
+            node = self.parser.parse(expr)
+            self.assertEqual(val, node.ex(ctx), msg=expr)
+            self.assertEqual(val, node.compile()(ctx), msg=expr)
+
+    def test_referenced_names(self):
+        node = self.parser.parse('$user.geo.cc == "fr" and ($user.age > 18 or $vip) ? $a : b')
+        self.assertEqual(set(['user', 'vip', 'a']), node.referenced_names())
+        self.assertEqual(set(), self.parser.parse('a == b').referenced_names())
+
+    def test_specialize(self):
+        node = self.parser.parse('$region == "eu" and $tier >= 2').specialize({'region': 'eu'})
+        self.assertEqual(self.parser.parse('$tier >= 2').ast(), node.ast())
+
+        node = self.parser.parse('$region == "eu" and $tier >= 2').specialize({'region': 'us'})
+        self.assertIsInstance(node, nodes.LiteralFalse)
+
+    def test_equality(self):
+        self.assertEqual(nodes.Identifier('a.b'), nodes.Identifier('a.b'))
+        self.assertNotEqual(nodes.Identifier('a.b'), nodes.Identifier('a'))
+        self.assertNotEqual(nodes.Identifier('a'), nodes.LiteralString('a'))
+
+
+class TestSlots(TestCase):
+    def test_no_instance_dict(self):
+        tree = Parser(engine='fast').parse('!(a =~ "^x") and 1 < 2 ? a not in b : #c')
+        todo = [tree, nodes.LiteralTrue(), nodes.LiteralFalse(), nodes.LiteralNull()]
+        while todo:
+            node = todo.pop()
+            self.assertFalse(hasattr(node, '__dict__'), msg=type(node).__name__)
+            todo.extend(node.children())
+
+            op = getattr(node, 'op', None)
+            if op is not None:
+                self.assertFalse(hasattr(op, '__dict__'))
+
+
+class TestFromAst(TestCase):
+    def test_round_trip(self):
+        parser = Parser(engine='fast')
+        for expr in (
+            'abc', '123', '"a b"', '-1', '#abc', 'not a', 'a not in b', '$a.b.0',
+            'a =~ "^x" and b is not c', 'a ? b : c or d', 'a !~ /^x/is',
+        ):
+            ast = parser.parse(expr).ast()
+            node = nodes.from_ast(ast)
+            self.assertEqual(ast, node.ast(), msg=expr)
+
+        for node in (nodes.LiteralTrue(), nodes.LiteralFalse(), nodes.LiteralNull()):
+            self.assertIsInstance(nodes.from_ast(node.ast()), type(node))
+
+        self.assertIs(nodes.EqOp.ISNOT, nodes.Token.from_str(str(nodes.EqOp.ISNOT)))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            nodes.from_ast({'$type': 'Nope'})
+
+        with self.assertRaises(ValueError):
+            nodes.Token.from_str('<Nope(x)>')
+
+
 class TestSemantics(TestCase):
     def setUp(self):
         self.s = nodes.YepSemantics()
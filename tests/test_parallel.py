@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import copy
+import multiprocessing
+import pickle
+
+from yepr import nodes
+from yepr.parser import Parser
+from yepr.parallel import evaluate_many
+
+
+EXPRS = ['1 < 2', '#"abc" >= 3 and "x"', 'a =~ "^a" ? "re" : "no"', 'not (b in "abc")']
+
+VAR_EXPRS = ['$a > 1', '$u.geo.cc == "fr" or $a']
+
+
+class TestPickle(TestCase):
+    def test_token(self):
+        for op in (nodes.UnaryOp.NOT, nodes.LogicOp.OR, nodes.BinaryOp.NOTIN, nodes.EqOp.ISNOT):
+            self.assertIs(op, pickle.loads(pickle.dumps(op, protocol=pickle.HIGHEST_PROTOCOL)))
+            self.assertIs(op, copy.deepcopy(op))
+
+    def test_node(self):
+        parser = Parser(engine='fast')
+        for expr in EXPRS:
+            node = parser.parse(expr)
+            clone = pickle.loads(pickle.dumps(node, protocol=pickle.HIGHEST_PROTOCOL))
+
+            self.assertIsNot(node, clone)
+            self.assertEqual(node, clone)
+            self.assertEqual(node.ex({}), clone.ex({}))
+
+    def test_identifier(self):
+        ctx = {'a': 2, 'u': {'geo': {'cc': 'de'}}}
+        for expr in VAR_EXPRS:
+            node = Parser(engine='fast').parse(expr)
+            clone = pickle.loads(pickle.dumps(node, protocol=pickle.HIGHEST_PROTOCOL))
+
+            self.assertEqual(node, clone)
+            self.assertEqual(node.ex(ctx), clone.ex(ctx))
+            self.assertEqual(node.ex(ctx), copy.deepcopy(node).ex(ctx))
+
+
+class TestEvaluateMany(TestCase):
+    def test_order(self):
+        exprs = EXPRS + [nodes.BinaryExp(nodes.BinaryOp.LT, nodes.Identifier('i'), nodes.LiteralNumber('25'))]
+        contexts = [{'i': i} for i in range(50)]
+        expected = [[True, 'x', 're', False, i < 25] for i in range(50)]
+
+        parser = Parser(engine='fast')
+        self.assertEqual(expected, list(evaluate_many(exprs, contexts, workers=0, parser=parser)))
+        self.assertEqual(expected, list(evaluate_many(exprs, contexts, workers=2, chunksize=7, parser=parser)))
+
+    def test_spawn(self):
+        # trees travel pickled to spawned workers, as on macOS and Windows
+        ctx = {'a': 2, 'u': {'geo': {'cc': 'fr'}}}
+        expected = [[True, 'x', 're', False, True, True]] * 5
+        results = evaluate_many(
+            EXPRS + VAR_EXPRS, [ctx] * 5, workers=2, chunksize=2,
+            context=multiprocessing.get_context('spawn'))
+
+        self.assertEqual(expected, list(results))
+
+    def test_early_exit(self):
+        results = evaluate_many(EXPRS, ({} for _ in range(1000)), workers=2, chunksize=3)
+        self.assertEqual([True, 'x', 're', False], next(results))
+        results.close()
@@ -3,7 +3,10 @@ from __future__ import print_function, division, absolute_import, unicode_litera
 from builtins import str
 
 from unittest import TestCase
+import pickle
+import threading
 
+from yepr.fast_parser import ParseError
 from yepr.parser import Parser
 
 
@@ -33,3 +36,73 @@ class TestParser(TestCase):
         self.assertEqual(parser.parse_and_ex('a or b', {}), 'a')
         self.assertEqual(parser.parse_and_ex('a and b or c', {}), 'b')
         self.assertEqual(parser.parse_and_ex('a and b and c', {}), 'c')
+
+    def test_cache(self):
+        parser = Parser(cache_size=2)
+
+        ast = parser.parse('a and b')
+        self.assertIs(ast, parser.parse('a and b'))
+        self.assertEqual(parser.parse_and_ex('a and b', {}), 'b')
+
+        info = parser.cache_info()
+        self.assertEqual(2, info.hits)
+        self.assertEqual(1, info.misses)
+
+        parser.parse('a or b')
+        parser.parse('c or d')
+        self.assertEqual(1, parser.cache_info().evictions)
+        self.assertIsNot(ast, parser.parse('a and b'))
+
+    def test_grako_tuning(self):
+        exprs = [
+            'a == "b" and (x > 1 or not $c.d) ? 1 : "n"',
+            '#$body > 3 && $x =~ "a.*b" || foo is not "x"',
+            ' and '.join('($k{0} == "v{0}" or $j{0} in "abc")'.format(i) for i in range(30)),
+        ]
+        expected = [Parser(cache_size=0, memoize=True, left_recursion=True).parse(e).ast() for e in exprs]
+
+        for memoize in (True, False, ['simple_string', 'KW']):
+            parser = Parser(cache_size=0, memoize=memoize)
+            self.assertEqual(expected, [parser.parse(e).ast() for e in exprs], msg=memoize)
+            with self.assertRaises(Exception):
+                parser.parse('a and')
+
+        with self.assertRaises(ValueError):
+            Parser(memoize=False, left_recursion=True)
+
+    def test_grako_per_thread(self):
+        parser = Parser(cache_size=0)
+        parser.parse('a and b')
+        mine = parser._local.parser
+
+        parser.parse('a or b')
+        self.assertIs(mine, parser._local.parser)
+
+        found = []
+        thread = threading.Thread(target=lambda: found.append((parser.parse('a < b').ex({}), parser._local.parser)))
+        thread.start()
+        thread.join()
+        self.assertEqual(True, found[0][0])
+        self.assertIsNot(mine, found[0][1])
+
+    def test_parse_many(self):
+        exprs = ['a and b', '(', '$x =~ /^a/i', 'a and b', '1 < 2', '"x" in $y', '(', 'a ? b']
+        for engine in ('grako', 'fast'):
+            expected = []
+            for expr in exprs:
+                try:
+                    expected.append(Parser(engine=engine).parse(expr))
+                except Exception as e:
+                    # one error type for syntax errors, in this process or not
+                    expected.append((ParseError, expr))
+
+            for workers, chunksize in ((0, 256), (2, 3)):
+                parser = Parser(engine=engine)
+                trees = parser.parse_many(iter(exprs), workers=workers, chunksize=chunksize)
+
+                self.assertEqual(expected, [(type(t), t.text) if isinstance(t, Exception) else t for t in trees])
+                self.assertEqual(str(trees[1]), str(pickle.loads(pickle.dumps(trees[1]))))
+                # equal texts share their tree, through the cache from now on
+                self.assertIs(trees[0], trees[3])
+                self.assertIs(trees[0], parser.parse('a and b'))
+                self.assertIs(True, parser.parse_many(['1 < 2'])[0].ex({}))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import io
+import os
+import shutil
+import struct
+import tempfile
+
+from yepr import rulefile
+from yepr.parser import Parser
+
+
+class CountingParser(Parser):
+    def __init__(self):
+        super(CountingParser, self).__init__(cache_size=0, engine='fast')
+        self.parsed = []
+
+    def _parse(self, expr):
+        self.parsed.append(expr)
+        return super(CountingParser, self)._parse(expr)
+
+
+RULES = '''
+# comment
+admin: $user.role == "admin"
+big:   #$cart > 10 ? "yes" : "no"
+bot:$agent =~ /^curl/i
+'''
+
+
+class TestRuleFile(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'rules.yepr')
+        self.write(RULES)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text, path=None):
+        with io.open(path or self.path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_read(self):
+        self.assertEqual([
+            ('admin', '$user.role == "admin"', 3),
+            ('big', '#$cart > 10 ? "yes" : "no"', 4),
+            ('bot', '$agent =~ /^curl/i', 5),
+        ], rulefile.read(self.path))
+
+        path = os.path.join(self.dir, 'rules.json')
+        self.write('{"b": "a and b", "a": "c"}', path)
+        self.assertEqual([('b', 'a and b', None), ('a', 'c', None)], rulefile.read(path))
+
+        for text, path in (
+            ('a and b', self.path),
+            ('a: b\na: c', self.path),
+            ('["a", "b"]', path),
+            ('{"a": {"b": "c"}}', path),
+        ):
+            self.write(text, path)
+            with self.assertRaises(ValueError):
+                rulefile.read(path)
+
+    def test_cache(self):
+        parser = CountingParser()
+        rules = rulefile.load(self.path, parser=parser)
+        expected = [(name, Parser(engine='fast').parse(expr)) for name, expr, _ in rulefile.read(self.path)]
+
+        self.assertEqual(expected, list(rules))
+        self.assertEqual(3, len(parser.parsed))
+        self.assertTrue(os.path.exists(self.path + '.cache'))
+
+        # unchanged: all from the cache, which is left alone
+        mtime = os.path.getmtime(self.path + '.cache')
+        self.assertEqual(expected, list(rulefile.load(self.path, parser=parser)))
+        self.assertEqual(3, len(parser.parsed))
+        self.assertEqual(mtime, os.path.getmtime(self.path + '.cache'))
+
+        # one changed, one renamed, one removed
+        self.write('admin: $user.role == "root"\nlarge: #$cart > 10 ? "yes" : "no"\n')
+        rules = rulefile.load(self.path, parser=parser)
+        self.assertEqual(['$user.role == "root"'], parser.parsed[3:])
+        self.assertEqual(['admin', 'large'], [name for name, _ in rules])
+        self.assertEqual(expected[1][1], rules[1][1])
+
+        with open(self.path + '.cache', 'rb') as f:
+            self.assertEqual(2, len(rulefile.serialize.load(f)))
+
+    def test_bad_cache(self):
+        for data in (b'', b'YEPR nope', b'garbage' * 10):
+            with open(self.path + '.cache', 'wb') as f:
+                f.write(data)
+
+            parser = CountingParser()
+            self.assertEqual(3, len(rulefile.load(self.path, parser=parser)))
+            self.assertEqual(3, len(parser.parsed))
+
+            rulefile.load(self.path, parser=parser)
+            self.assertEqual(3, len(parser.parsed))
+
+    def test_lazy(self):
+        parser = CountingParser()
+        expected = list(rulefile.load(self.path, parser=parser))
+
+        # the last code of the last rule: only noticed, and that rule parsed, when it is read
+        with open(self.path + '.cache', 'r+b') as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(struct.pack('<i', 1000))
+
+        rules = rulefile.load(self.path, parser=parser)
+        self.assertEqual(['admin', 'big', 'bot'], rules.names)
+        self.assertEqual(expected[1], rules[-2])
+        self.assertEqual(expected[:2], rules[:2])
+        self.assertEqual(3, len(parser.parsed))
+
+        self.assertEqual(expected[2], rules[-1])
+        self.assertEqual(['$agent =~ /^curl/i'], parser.parsed[3:])
+
+    def test_no_cache(self):
+        parser = CountingParser()
+        rulefile.load(self.path, parser=parser, cache_path=False)
+        rulefile.load(self.path, parser=parser, cache_path=False)
+
+        self.assertEqual(6, len(parser.parsed))
+        self.assertEqual(['rules.yepr'], os.listdir(self.dir))
+
+    def test_errors(self):
+        self.write('a: b\n\nc: (d\n')
+        with self.assertRaisesRegexp(ValueError, r'rules.yepr:3: rule .c.'):
+            rulefile.load(self.path, parser=CountingParser())
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import re
+import threading
+
+from yepr import nodes
+from yepr.parser import Parser
+from yepr.keywords import KeywordSet
+from yepr.multiregex import MultiPattern
+from yepr.ruleset import RuleSet
+
+from . import Var
+
+
+class TestEquality(TestCase):
+    def test_structural(self):
+        parser = Parser(cache_size=0, engine='fast')
+        a, b = parser.parse('x == "eu" and y >= 2'), parser.parse('x == "eu" and y >= 2')
+
+        self.assertIsNot(a, b)
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(1, len(set([a, b])))
+
+        for other in ('x == "eu" and y > 2', 'x == "eu" or y >= 2', 'x == eu and y >= "2"', 'y >= 2'):
+            self.assertNotEqual(a, parser.parse(other), msg=other)
+
+        self.assertNotEqual(parser.parse('1'), nodes.LiteralTrue())
+        self.assertNotEqual(parser.parse('"1"'), parser.parse('1'))
+
+    def test_identity_fallback(self):
+        self.assertNotEqual(Var('x'), Var('x'))
+
+        v = Var('x')
+        self.assertEqual(nodes.UnaryExp(nodes.UnaryOp.NOT, v), nodes.UnaryExp(nodes.UnaryOp.NOT, v))
+
+
+class TestRuleSet(TestCase):
+    def rules(self, x):
+        eu = nodes.EqExp(nodes.EqOp.EQ, x, nodes.LiteralString('eu'))
+        return RuleSet([
+            ('eu', eu),
+            ('eu_or', nodes.LogicOrExp(nodes.LogicOp.OR, eu, nodes.LiteralString('no'))),
+            ('not_eu', nodes.UnaryExp(nodes.UnaryOp.NOT, nodes.EqExp(nodes.EqOp.EQ, x, nodes.LiteralString('eu')))),
+            ('us', nodes.EqExp(nodes.EqOp.EQ, x, nodes.LiteralString('us'))),
+            ('skip', nodes.LogicAndExp(nodes.LogicOp.AND, nodes.LiteralFalse(), x)),
+        ])
+
+    def test_ex(self):
+        x = Var('x')
+        rules = self.rules(x)
+
+        self.assertEqual({'eu': True, 'eu_or': True, 'not_eu': False, 'us': False, 'skip': False}, rules.ex({'x': 'eu'}))
+        # x is read once per context, `x == "eu"` is shared by three rules
+        self.assertEqual(1, x.calls)
+
+        self.assertEqual({'eu': False, 'eu_or': 'no', 'not_eu': True, 'us': True, 'skip': False}, rules.ex({'x': 'us'}))
+        self.assertEqual(2, x.calls)
+
+        self.assertEqual({'rules': 5, 'nodes': 18, 'distinct': 10, 'shared': 2}, rules.info())
+
+    def test_lazy(self):
+        x = Var('x')
+        rules = RuleSet([('a', nodes.LogicAndExp(nodes.LogicOp.AND, nodes.LiteralFalse(), x))])
+
+        self.assertEqual({'a': False}, rules.ex({}))
+        self.assertEqual(0, x.calls)
+
+    def test_text(self):
+        rules = RuleSet({'a': '1 < 2 and "x"', 'b': 'not (1 < 2)'}, parser=Parser(engine='fast'))
+        rules.add('c', '1 < 2 ? "y" : "n"')
+
+        self.assertEqual(['a', 'b', 'c'], sorted(rules.names))
+        self.assertEqual({'a': 'x', 'b': False, 'c': 'y'}, rules.ex({}))
+        self.assertEqual(1, rules.info()['shared'])
+
+    def test_identifiers(self):
+        rules = RuleSet({'a': '$x > 1', 'b': '$y > 1', 'c': '$x > 1 or $y.z'}, parser=Parser(engine='fast'))
+
+        self.assertEqual({'a': True, 'b': False, 'c': True}, rules.ex({'x': 2, 'y': 0}))
+        self.assertEqual(1, rules.info()['shared'])
+
+    def test_threads(self):
+        x = Var('x')
+        rules = self.rules(x)
+        errors = []
+
+        def run(val):
+            try:
+                for _ in range(200):
+                    assert rules.ex({'x': val})['eu'] == (val == 'eu')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(val,)) for val in ('eu', 'us', 'eu', 'fr')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+
+
+class TestPatterns(TestCase):
+    def test_multi_pattern(self):
+        patterns = [re.compile(p, f) for p, f in [
+            ('^GET ', 0), ('^/api', re.I), ('bot', 0), (r'^x(y)\1', 0), (r'\Aa.b', re.S),
+            ('^a|b', 0), ('^(?P<n>q)', 0), ('^z', re.M),
+        ]]
+        multi = MultiPattern(patterns)
+        self.assertEqual(3, len(multi._merged))
+
+        for text in ('GET /robots', '/API/x', 'xyy', 'a\nb', 'q\nz', 'b', ''):
+            self.assertEqual([bool(p.search(text)) for p in patterns], multi.search(text), msg=text)
+
+        with self.assertRaises(TypeError):
+            multi.search(None)
+
+    def test_merged(self):
+        rules = {
+            'api': '$path =~ /^\\/api\\//',
+            'v1': '$path =~ "^/api/v1" and $path !~ /^\\/api\\/v1\\/admin/i',
+            'static': '$path =~ /^\\/static/ or $path =~ /\\.css$/',
+            'other': '$q =~ /^x/ or $q =~ /^y/',
+        }
+        rule_set = RuleSet(rules, parser=Parser(engine='fast'))
+        fns = dict((name, Parser(engine='fast').parse(expr).compile()) for name, expr in rules.items())
+        # all but `/\.css$/`, in one group per field
+        groups = rule_set._groups(rule_set._refs())
+        self.assertEqual([2, 4], sorted(len(g.matcher.patterns) for g in set(g for g, _ in groups.values())))
+
+        for ctx in (
+            {'path': '/api/v1/users', 'q': 'y'},
+            {'path': '/API/V1/ADMIN', 'q': 'x'},
+            {'path': '/api/v1/Admin/x', 'q': ''},
+            {'path': '/static/a.css', 'q': 'z'},
+            {'path': '/x.css', 'q': 'yy'},
+        ):
+            self.assertEqual(dict((name, fn(ctx)) for name, fn in fns.items()), rule_set.ex(ctx), msg=ctx)
+
+    def test_errors(self):
+        rule_set = RuleSet({'a': '$x =~ /^a/', 'b': '$x !~ /^b/ or $y'}, parser=Parser(engine='fast'))
+
+        self.assertEqual({'a': True, 'b': True}, rule_set.ex({'x': 'a'}))
+        for x in (None, 1, b'a'):
+            with self.assertRaises(TypeError):
+                rule_set.ex({'x': x})
+
+    def test_keyword_set(self):
+        words = ['he', 'she', 'his', 'hers', '', 'é', 'sé', 'x', 'hers']
+        keywords = KeywordSet(words)
+
+        for text in ('ushers', 'this', 'hé', 'osé', '', 'x' * 5):
+            self.assertEqual([w in text for w in words], keywords.search(text), msg=text)
+
+        with self.assertRaises(TypeError):
+            keywords.search(b'he')
+
+    def test_keywords(self):
+        rules = {
+            'sql': '"select" in $body and "union" in $body',
+            'xss': '"<script" in $body or "onerror=" in $body',
+            'safe': '"<script" not in $body',
+            'tag': '"union" in $tags',
+        }
+        for min_keywords in (2, 100):
+            rule_set = RuleSet(rules, parser=Parser(engine='fast'), min_keywords=min_keywords)
+            groups = rule_set._groups(rule_set._refs())
+            self.assertEqual(5 if min_keywords == 2 else 0, len(groups))
+
+            fns = dict((name, Parser(engine='fast').parse(expr).compile()) for name, expr in rules.items())
+            for ctx in (
+                {'body': '1 UNION select 2 union', 'tags': ['union']},
+                {'body': '<img onerror=x>', 'tags': 'onion'},
+                {'body': '<script>', 'tags': {'union': 1}},
+            ):
+                self.assertEqual(dict((name, fn(ctx)) for name, fn in fns.items()), rule_set.ex(ctx), msg=ctx)
+
+            with self.assertRaises(TypeError):
+                rule_set.ex({'body': None, 'tags': []})
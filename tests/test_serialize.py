@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from unittest import TestCase
+import io
+import struct
+import subprocess
+import sys
+
+from yepr import nodes, serialize
+from yepr.parser import Parser
+
+from .test_fast_parser import VALID
+
+
+class TestSerialize(TestCase):
+    def setUp(self):
+        parser = Parser(engine='fast')
+        self.rules = [('r{}'.format(i), expr, parser.parse(expr)) for i, expr in enumerate(VALID)]
+
+    def test_round_trip(self):
+        bundle = serialize.loads(serialize.dumps(self.rules))
+
+        self.assertEqual(len(self.rules), len(bundle))
+        self.assertEqual([name for name, _, _ in self.rules], bundle.names)
+        for i, (name, expr, node) in enumerate(self.rules):
+            self.assertEqual(node.ast(), bundle.node(i).ast(), msg=expr)
+            self.assertEqual(serialize.source_hash(expr), bundle.hashes[i])
+
+        # decoded once, then reused
+        self.assertIs(bundle.node(0), bundle.node(0))
+
+    def test_file(self):
+        f = io.BytesIO()
+        serialize.dump(self.rules[:3], f)
+        f.seek(0)
+
+        bundle = serialize.load(f)
+        self.assertEqual(['r0', 'r1', 'r2'], [name for name, _ in bundle.items()])
+
+    def test_literal_pool(self):
+        codes, pool = [], []
+        node = Parser(engine='fast').parse('a == a or 1 < "1"')
+        node = nodes.LogicOrExp(nodes.LogicOp.OR, node, nodes.LiteralNumber(1.5))
+        serialize.encode(node, codes, pool, {})
+
+        # the number 1 is kept as its source text, 1.5 is a float
+        self.assertEqual(['a', '1', 1.5], pool)
+        self.assertEqual(node.ast(), serialize.decode(codes, pool).ast())
+
+    def test_errors(self):
+        data = serialize.dumps(self.rules)
+
+        with self.assertRaises(ValueError):
+            serialize.loads(b'NOPE' + data[4:])
+
+        future = data[:4] + struct.pack('<H', serialize.FORMAT_VERSION + 1) + data[6:]
+        with self.assertRaises(ValueError):
+            serialize.loads(future)
+
+        with self.assertRaises(ValueError):
+            serialize.loads(data[:-4])
+
+        with self.assertRaises(TypeError):
+            serialize.dumps([('x', 'x', object())])
+        codes, pool = [], []
+        serialize.encode(Parser(engine='fast').parse('a < 1 and not $b'), codes, pool, {})
+        for bad_codes, bad_pool in (
+            (codes[:-1], pool),         # an operand short
+            (codes[1:], pool),          # a pool index read as a tag
+            (codes + [1000], pool),     # no such tag
+            (codes, pool[:-1]),         # no such pool entry
+        ):
+            with self.assertRaisesRegexp(ValueError, 'corrupt code stream'):
+                serialize.decode(bad_codes, bad_pool)
+
+        for val in ([1, 2], {'a': 1}, object()):
+            with self.assertRaisesRegexp(TypeError, 'cannot serialize'):
+                serialize.dumps([('x', 'x', nodes.Literal(val))])
+
+    def test_no_grako(self):
+        code = 'import sys, yepr.serialize; print("grako" in sys.modules)'
+        self.assertEqual(b'False', subprocess.check_output([sys.executable, '-c', code]).strip())
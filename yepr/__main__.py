@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Reorder the operands of and/or chains by measured cost and selectivity.
+
+    rule = AdaptiveRule(tree, sample=1000)
+    for ctx in contexts:
+        rule.ex(ctx)                # the first 1000 calls collect statistics
+
+    saved = rule.stats()            # JSON-able, e.g. to survive restarts
+    rule = AdaptiveRule(tree, stats=saved)      # optimized from the start
+
+While sampling, every operand of a flattened `and`/`or` chain records how
+often it ran, how long it took and how often it was true.  Then each chain
+is rewritten to evaluate first the operands that settle it cheapest: the
+lowest `cost / P(false)` first for `and`, `cost / P(true)` for `or`.
+
+Only chains whose value does not change with the order are rewritten: the
+operands must all be built from this package's node classes (free of side
+effects), and either all give booleans or the chain is only tested for
+truth (`predicate=True`, the condition of `?:`, the operand of `not`...).
+Should the reordered tree raise for a context, that context is evaluated
+again in the written order, so errors surface exactly as before; a
+reordered chain may however skip an operand that would have raised.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+import hashlib
+import json
+
+try:
+    from time import perf_counter as timer
+except ImportError:     # py2
+    from time import time as timer
+
+from .nodes import (
+    Node, UnaryOp, Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull,
+    LiteralRegex, Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+STATS_VERSION = 1
+
+# classes known to evaluate without side effects
+_PURE = (
+    Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex,
+    Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+def operand_key(node):
+    """Stable id of a subtree, the same across processes and restarts."""
+    text = json.dumps(node.ast(), sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def chain(node):
+    """Operands of the and/or chain rooted at `node`, in evaluation order."""
+    cls, out, todo = type(node), [], [node]
+    while todo:
+        node = todo.pop()
+        if type(node) is cls:
+            todo.extend(reversed(node.operands))
+        else:
+            out.append(node)
+
+    return out
+
+
+def _is_pure(node):
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        if type(node) not in _PURE:
+            return False
+        todo.extend(node.children())
+
+    return True
+
+
+def _is_bool(node):
+    """Whether `node` always evaluates to True or False."""
+    cls = type(node)
+    if cls in (EqExp, BinaryExp, LiteralTrue, LiteralFalse):
+        return True
+    elif cls is UnaryExp:
+        return node.op == UnaryOp.NOT
+    elif cls in (LogicAndExp, LogicOrExp):
+        return all(_is_bool(n) for n in chain(node))
+    elif cls is CondExp:
+        return _is_bool(node.yes) and _is_bool(node.no)
+
+    return False
+
+
+def _rebuild(node, fn):
+    """Copy of `node` with every child replaced by `fn(child, boolean)`."""
+    cls = type(node)
+    children = []
+    for i, child in enumerate(node.children()):
+        # whether only the truth of that child's value matters
+        boolean = (
+            (cls is CondExp and i == 0)
+            or (cls is UnaryExp and node.op == UnaryOp.NOT)
+        )
+        children.append(fn(child, boolean))
+
+    return node.with_children(children)
+
+
+def _transform(node, boolean, on_chain):
+    """Walk `node`, handing reorderable chains to `on_chain(cls, op, operands, written)`.
+
+    `written` are the operands as found in `node`, `operands` the same
+    with their own chains transformed already.
+    """
+    cls = type(node)
+    if cls in (LogicAndExp, LogicOrExp):
+        operands = chain(node)
+        if (boolean or _is_bool(node)) and all(_is_pure(n) for n in operands):
+            return on_chain(cls, node.op, [_transform(n, True, on_chain) for n in operands], operands)
+
+        # written order kept: all but the last operand are only tested
+        last = len(operands) - 1
+        operands = [_transform(n, boolean or i < last, on_chain) for i, n in enumerate(operands)]
+        return _join(cls, node.op, operands)
+
+    if not node.children():
+        return node
+
+    return _rebuild(node, lambda child, child_bool: _transform(
+        child, child_bool or (boolean and cls is CondExp), on_chain))
+
+
+def _join(cls, op, operands):
+    return cls(op, *operands) if len(operands) > 1 else operands[0]
+
+
+class _Probe(Node):
+    """Times one chain operand and counts how often it is true."""
+    __slots__ = ('node', 'stat')
+
+    def __init__(self, node, stat):
+        self.node, self.stat = node, stat
+
+    def ex(self, ctx):
+        return self.compile()(ctx)
+
+    def compile(self):
+        fn, stat = self.node.compile(), self.stat
+
+        def probe(ctx):
+            start = timer()
+            val = fn(ctx)
+            stat[1] += timer() - start
+            stat[0] += 1
+            if val:
+                stat[2] += 1
+            return val
+
+        return probe
+
+
+class AdaptiveRule(object):
+    def __init__(self, node, sample=1000, predicate=True, stats=None):
+        """`predicate`: callers only use the truth of the value, `ex()` returns a bool."""
+        self.node = node
+        self.sample = sample
+        self.predicate = predicate
+
+        self._stats = {}    # operand key -> [calls, seconds, trues]
+        self._fallback = node.compile()
+        if stats is not None:
+            self.load_stats(stats)
+        else:
+            self.reset()
+
+    # sampling {{{
+    def reset(self):
+        """Start collecting statistics again, with the written order."""
+        self._left = self.sample
+        self.tree = _transform(self.node, self.predicate, self._probe_chain)
+        self._fn = self.tree.compile()
+
+    def _probe_chain(self, cls, op, operands, written):
+        probes = []
+        for operand, orig in zip(operands, written):
+            stat = self._stats.setdefault(operand_key(orig), [0, 0.0, 0])
+            probes.append(_Probe(operand, stat))
+
+        return _join(cls, op, probes)
+    # }}} sampling
+
+    # optimizing {{{
+    def optimize(self):
+        """Rewrite the chains with the statistics collected so far."""
+        self._left = None
+        self.tree = _transform(self.node, self.predicate, self._reorder_chain)
+        self._fn = self.tree.compile()
+
+    def _reorder_chain(self, cls, op, operands, written):
+        keys = [operand_key(orig) for orig in written]
+
+        def rank(item):
+            i, operand = item
+            calls, seconds, trues = self._stats.get(keys[i], (0, 0.0, 0))
+            if not calls:
+                # never reached: keep it where it is, behind the measured ones
+                return (1, i)
+
+            cost = seconds / calls
+            settles = (calls - trues if cls is LogicAndExp else trues) / calls
+            return (0, cost / settles if settles else float('inf'), i)
+
+        ordered = [operand for _, operand in sorted(enumerate(operands), key=rank)]
+        return _join(cls, op, ordered)
+    # }}} optimizing
+
+    def ex(self, ctx):
+        if self._left is not None:
+            self._left -= 1
+            if self._left < 0:
+                self.optimize()
+
+        try:
+            val = self._fn(ctx)
+        except Exception:
+            # reordering may have moved a failing operand first
+            val = self._fallback(ctx)
+
+        return bool(val) if self.predicate else val
+
+    def stats(self):
+        return {
+            'version': STATS_VERSION,
+            'operands': dict((key, list(stat)) for key, stat in self._stats.items()),
+        }
+
+    def load_stats(self, stats):
+        """Add exported statistics to ours and optimize with them."""
+        if stats.get('version') != STATS_VERSION:
+            raise ValueError('unsupported statistics version {!r}'.format(stats.get('version')))
+
+        for key, (calls, seconds, trues) in stats['operands'].items():
+            stat = self._stats.setdefault(key, [0, 0.0, 0])
+            stat[0] += calls
+            stat[1] += seconds
+            stat[2] += trues
+
+        self.optimize()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""asyncio evaluation with context values fetched on demand.
+
+Context values may be awaitables, or coroutine functions called without
+arguments, next to plain values::
+
+    ctx = {'user': fetch_user(uid), 'quota': load_quota, 'plan': 'pro'}
+    val = await tree.ex_async(ctx)
+
+A value is only fetched when evaluation reaches a node reading it, and at
+most once per evaluation however many nodes read it.  `and`, `or` and `?:`
+short-circuit as in `ex()`; both operands of the other binary operators are
+evaluated concurrently.
+
+Node classes can take part by overriding `ex_async(self, ctx)`: `ctx` is
+then an `AsyncContext` and `await ctx.get(name)` fetches one value.  Nodes
+that don't are evaluated with `ex()` over the fully resolved context.
+
+Python 3.5+ only, unlike the rest of the package.
+"""
+import asyncio
+import inspect
+
+from .nodes import (
+    EqOp, Node, Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull,
+    LiteralRegex, Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+class AsyncContext(object):
+    """Resolves the values of a context, sharing one fetch per key."""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self._futures = {}
+
+    async def get(self, key):
+        fut = self._futures.get(key)
+        if fut is None:
+            val = self.ctx[key]
+            if inspect.iscoroutinefunction(val):
+                val = val()
+            if not inspect.isawaitable(val):
+                return val
+
+            fut = self._futures[key] = asyncio.ensure_future(val)
+
+        # another reader giving up must not cancel the fetch for everyone
+        return await asyncio.shield(fut)
+
+    def cancel(self):
+        for fut in self._futures.values():
+            fut.cancel()
+
+    async def resolve_all(self):
+        keys = list(self.ctx)
+        vals = await asyncio.gather(*(self.get(key) for key in keys))
+        return dict(zip(keys, vals))
+
+
+async def ex_async(node, ctx):
+    if isinstance(ctx, AsyncContext):
+        return await _ex(node, ctx)
+
+    ctx = AsyncContext(ctx)
+    try:
+        return await _ex(node, ctx)
+    except BaseException:
+        # fetches still running for an operand that will never be used
+        ctx.cancel()
+        raise
+
+
+_handlers = {}
+
+
+def _handles(*classes):
+    def deco(fn):
+        for cls in classes:
+            _handlers[cls] = fn
+        return fn
+
+    return deco
+
+
+async def _ex(node, ctx):
+    # exact type match only, like columnar: a subclass may well override `ex`
+    handler = _handlers.get(type(node))
+    if handler is not None:
+        return await handler(node, ctx)
+    elif type(node).ex_async is not Node.ex_async:
+        return await node.ex_async(ctx)
+
+    return node.ex(await ctx.resolve_all())
+
+
+async def _pair(l, r, ctx):
+    """Values of `l` and `r`, running both at once unless one is a literal."""
+    if isinstance(l, Literal):
+        return l.ex(None), await _ex(r, ctx)
+    elif isinstance(r, Literal):
+        return await _ex(l, ctx), r.ex(None)
+
+    l, r = asyncio.ensure_future(_ex(l, ctx)), asyncio.ensure_future(_ex(r, ctx))
+    try:
+        return await l, await r
+    except BaseException:
+        l.cancel()
+        r.cancel()
+        raise
+
+
+# handlers {{{
+@_handles(Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex)
+async def _ex_literal(node, ctx):
+    return node.ex(None)
+
+
+@_handles(Identifier)
+async def _ex_identifier(node, ctx):
+    root = node.keys[0]
+    if root not in ctx.ctx:
+        return None     # as ex(); a KeyError from a resolver is its own error
+
+    val = await ctx.get(root)
+
+    # the rest of the path is plain data
+    return node.get({root: val})
+
+
+@_handles(UnaryExp)
+async def _ex_unary(node, ctx):
+    return node.op.opts['fn'](await _ex(node.exp, ctx))
+
+
+@_handles(BinaryExp)
+async def _ex_binary(node, ctx):
+    l, r = await _pair(node.l, node.r, ctx)
+    return node.op.opts['fn'](l, r)
+
+
+@_handles(EqExp)
+async def _ex_eq(node, ctx):
+    if node.pat is None:
+        return await _ex_binary(node, ctx)
+
+    found = node.pat.search(await _ex(node.l, ctx))
+    return bool(found) if node.op == EqOp.RE else not found
+
+
+@_handles(LogicAndExp, LogicOrExp)
+async def _ex_logic(node, ctx):
+    stop = node._stop
+    for operand in node.operands:
+        val = await _ex(operand, ctx)
+        if bool(val) is stop:
+            break
+
+    return val
+
+
+@_handles(CondExp)
+async def _ex_cond(node, ctx):
+    return await _ex(node.yes if await _ex(node.cond, ctx) else node.no, ctx)
+# }}} handlers
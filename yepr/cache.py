@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+
+from collections import OrderedDict, namedtuple
+import threading
+
+
+class CacheInfo(namedtuple('CacheInfo', 'hits, misses, evictions, maxsize, currsize')):
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(object):
+    """Size-bounded, thread-safe mapping with least-recently-used eviction.
+
+    ``maxsize=None`` means unbounded, ``maxsize=0`` disables caching.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                val = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._data[key] = val
+            self.hits += 1
+            return val
+
+    def set(self, key, val):
+        if self.maxsize == 0:
+            return
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = val
+            self._trim()
+
+    def _trim(self):
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for `key`, building it with `factory(key)` on a miss.
+
+        The factory runs outside the lock, so two threads missing on the same
+        key at once may both build it; the last one wins.
+        """
+        missing = self._missing
+        val = self.get(key, missing)
+        if val is missing:
+            val = factory(key)
+            self.set(key, val)
+
+        return val
+
+    _missing = object()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        return CacheInfo(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.maxsize,
+            len(self._data),
+        )
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Filter or map newline-delimited JSON records with an expression.
+
+    python -m yepr 'EXPR' [FILE ...]            # records for which EXPR is true
+    python -m yepr --map 'EXPR' [FILE ...]      # the value of EXPR per record
+
+    python -m yepr '$level == "error" and $req.status >= 500' app.log
+
+Records are read from the files, or stdin, one at a time; matching records
+are written back byte for byte.  A record is only JSON-decoded once the
+expression reads a field from it.
+
+With `--jobs`, the records travel to the worker processes as raw bytes, one
+object per chunk, and are decoded there; only the results (booleans when
+filtering, the encoded JSON when mapping) come back.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import errno
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:     # py2
+    from collections import Mapping
+
+from .parser import Parser
+
+
+class LazyRecord(Mapping):
+    """One input line, decoded on first lookup."""
+    __slots__ = ('raw', '_data')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.raw.decode('utf-8'))
+            if not isinstance(self._data, dict):
+                raise ValueError('record is not a JSON object')
+
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _lines(paths, buffer_size):
+    for path in paths or ['-']:
+        if path == '-':
+            f = io.open(sys.stdin.fileno(), 'rb', buffering=buffer_size, closefd=False)
+        else:
+            f = io.open(path, 'rb', buffering=buffer_size)
+
+        with f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def _dump(val):
+    return json.dumps(val, default=str).encode('utf-8') + b'\n'
+
+
+# --jobs {{{
+_fn = _out = None   # the expression of the current worker, and what to send back of a value
+
+
+def _init_worker(tree, predicate):
+    global _fn, _out
+    _fn, _out = tree.compile(), bool if predicate else _dump
+
+
+def _ex_chunk(blob):
+    """Values of the records in `blob`, and the exception that stopped it early."""
+    from .parallel import _picklable
+
+    values = []
+    for line in blob.split(b'\n')[:-1]:
+        try:
+            val = _fn(LazyRecord(line))
+        except Exception as e:
+            return values, _picklable(e)
+        values.append(_out(val))
+
+    return values, None
+
+
+def _ex_parallel(tree, lines, predicate, jobs, chunk_size):
+    """Yield for each line its value's truth (`predicate`) or encoded value, evaluated on `jobs` processes."""
+    lines = (line if line.endswith(b'\n') else line + b'\n' for line in lines)
+    blobs = iter(lambda: b''.join(itertools.islice(lines, chunk_size)), b'')
+
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(tree, predicate))
+    try:
+        while True:
+            # a bounded window, as in evaluate_many()
+            batch = list(itertools.islice(blobs, jobs * 4))
+            if not batch:
+                break
+
+            for values, error in pool.imap(_ex_chunk, batch):
+                for val in values:
+                    yield val
+                if error is not None:
+                    raise error
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+# }}} --jobs
+
+
+def main(argv=None, stdout=None):
+    parser = argparse.ArgumentParser(prog='yepr', description="Filter or map JSON lines with a yepr expression.")
+    parser.add_argument('expr', metavar='EXPR', help="the expression")
+    parser.add_argument('files', metavar='FILE', nargs='*', help="input files, stdin if none or '-'")
+    parser.add_argument('-m', '--map', action='store_true',
+                        help="write the value of EXPR for every record instead of filtering")
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help="evaluate on N processes, output order is kept")
+    parser.add_argument('--chunk-size', type=int, default=1024,
+                        help="records sent to a process at a time with --jobs")
+    parser.add_argument('--buffer-size', type=int, default=1 << 20,
+                        help="read buffer size in bytes")
+    parser.add_argument('--engine', choices=('fast', 'grako'), default='fast',
+                        help="parser to use for EXPR")
+    args = parser.parse_args(argv)
+
+    if stdout is None:
+        stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+
+    try:
+        tree = Parser(cache_size=0, engine=args.engine).parse(args.expr)
+    except Exception as e:
+        print('yepr: invalid expression: {}'.format(e), file=sys.stderr)
+        return 2
+
+    lines = _lines(args.files, args.buffer_size)
+    if not args.map:
+        # the lines in flight between the two copies are bounded by --jobs' window
+        lines, output = itertools.tee(lines)
+
+    if args.jobs:
+        values = _ex_parallel(tree, lines, not args.map, args.jobs, args.chunk_size)
+    else:
+        fn = tree.compile()
+        values = (fn(LazyRecord(line)) for line in lines)
+        if args.map:
+            values = (_dump(val) for val in values)
+
+    n = 0
+    try:
+        try:
+            for n, val in enumerate(values, 1):
+                if args.map:
+                    stdout.write(val)
+                else:
+                    line = next(output)
+                    if val:
+                        stdout.write(line if line.endswith(b'\n') else line + b'\n')
+        except Exception as e:
+            if _broken_pipe(e):
+                raise
+            print('yepr: record {}: {}: {}'.format(n + 1, e.__class__.__name__, e), file=sys.stderr)
+            return 1
+        finally:
+            stdout.flush()
+    except Exception as e:
+        if not _broken_pipe(e):
+            raise
+        # the reader went away, as with `| head`: stop quietly
+        _discard(stdout)
+
+    return 0
+
+
+def _broken_pipe(e):
+    return isinstance(e, (IOError, OSError)) and e.errno == errno.EPIPE
+
+
+def _discard(stdout):
+    """Point `stdout`'s descriptor at /dev/null, so flushing it at exit cannot fail again."""
+    try:
+        fd = stdout.fileno()
+    except (AttributeError, IOError, ValueError):
+        return      # not a file, nothing is flushed at exit
+
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, fd)
+    os.close(devnull)
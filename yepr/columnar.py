@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""Batch evaluation of one expression over columnar data with NumPy.
+
+Every handler below evaluates a node for the rows listed in `sel` (an index
+array) and returns either an array aligned to `sel` or a plain scalar when the
+value is the same for all of them.  `and`, `or` and `?:` narrow `sel` before
+evaluating the operands they would otherwise skip, so short-circuiting works
+per row.  Node classes without a handler are evaluated row by row with `ex()`.
+
+NumPy is an optional dependency: this module is only imported by
+`Node.ex_columns()`.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import str
+
+import numpy as np
+
+from .nodes import (
+    UnaryOp, BinaryOp, EqOp,
+    Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex,
+    Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+def ex_columns(node, cols, size=None):
+    cols = dict((k, np.asarray(v)) for k, v in cols.items())
+
+    sizes = set(len(v) for v in cols.values())
+    if size is not None:
+        sizes.add(size)
+    if len(sizes) != 1:
+        raise ValueError('columns must all have the same length, got {}'.format(sorted(sizes)))
+
+    size = sizes.pop()
+    val = _ex(node, cols, np.arange(size))
+
+    return val if _is_vec(val) else _full(size, val)
+
+
+_handlers = {}
+
+
+def _handles(*classes):
+    def deco(fn):
+        for cls in classes:
+            _handlers[cls] = fn
+        return fn
+
+    return deco
+
+
+def _ex(node, cols, sel):
+    # exact type match only: a subclass may well override `ex`
+    handler = _handlers.get(type(node), _ex_rows)
+
+    return handler(node, cols, sel)
+
+
+# helpers {{{
+def _is_vec(val):
+    return isinstance(val, np.ndarray)
+
+
+def _full(size, val):
+    # an empty object array is already filled with None
+    return np.empty(size, dtype=object) if val is None else np.full(size, val)
+
+
+def _to_array(vals):
+    types = set(type(v) for v in vals)
+    if len(types) == 1 and types.pop() in (bool, int, float, str):
+        return np.array(vals)
+
+    out = np.empty(len(vals), dtype=object)
+    out[:] = vals
+    return out
+
+
+def _truth(val):
+    kind = val.dtype.kind
+    if kind == 'b':
+        return val
+    elif kind in 'iufc':
+        return val != 0
+    elif kind in 'US':
+        return np.char.str_len(val) > 0
+
+    return _elementwise(bool, val).astype(bool)
+
+
+def _elementwise(fn, *args):
+    return np.frompyfunc(fn, len(args), 1)(*args)
+
+
+def _merge(mask, yes, no):
+    """Rows where `mask` is set take `yes`, the others `no`.
+
+    Each side is a scalar or an array aligned to its own rows.
+    """
+    yes, no = np.asarray(yes), np.asarray(no)
+    kinds = set(a.dtype.kind for a in (yes, no))
+    if kinds <= set('b') or kinds <= set('iufc') or kinds <= set('U'):
+        dtype = np.result_type(yes, no)
+    else:
+        # numpy would happily turn `True` into 'True' next to strings, or 1 next to numbers
+        dtype = object
+
+    out = np.empty(len(mask), dtype=dtype)
+    out[mask] = yes
+    out[~mask] = no
+    return out
+# }}} helpers
+
+
+# handlers {{{
+def _ex_rows(node, cols, sel):
+    """Fallback for nodes that cannot be vectorized: one `ex()` per row."""
+    names = list(cols)
+    if not names:
+        return _to_array([node.ex({}) for _ in sel])
+
+    columns = [cols[k][sel].tolist() for k in names]
+    return _to_array([node.ex(dict(zip(names, row))) for row in zip(*columns)])
+
+
+@_handles(Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex)
+def _ex_literal(node, cols, sel):
+    return node.ex(None)
+
+
+@_handles(Identifier)
+def _ex_identifier(node, cols, sel):
+    if len(node.keys) > 1:
+        # fields of objects stored in a column
+        return _ex_rows(node, cols, sel)
+
+    col = cols.get(node.name)
+    return None if col is None else col[sel]
+
+
+# numpy implements these operators on arrays with its ufuncs (np.less,
+# np.equal, np.negative, ...); the remaining ops go through `_elementwise`
+_VEC_OPS = set([
+    UnaryOp.PLUS, UnaryOp.MINUS,
+    BinaryOp.LE, BinaryOp.LT, BinaryOp.GE, BinaryOp.GT,
+    EqOp.EQ, EqOp.NE,
+])
+
+
+@_handles(UnaryExp)
+def _ex_unary(node, cols, sel):
+    op, val = node.op, _ex(node.exp, cols, sel)
+    if not _is_vec(val):
+        return op.opts['fn'](val)
+
+    if op == UnaryOp.NOT:
+        return ~_truth(val)
+    elif op == UnaryOp.HASH and val.dtype.kind in 'US':
+        return np.char.str_len(val)
+    elif op in _VEC_OPS:
+        # numpy has no +/- for booleans, python counts them as 0 and 1
+        return op.opts['fn'](val.astype(int) if val.dtype.kind == 'b' else val)
+
+    return _elementwise(op.opts['fn'], val).astype(int)
+
+
+@_handles(BinaryExp, EqExp)
+def _ex_binary(node, cols, sel):
+    op = node.op
+    l, r = _ex(node.l, cols, sel), _ex(node.r, cols, sel)
+    if not (_is_vec(l) or _is_vec(r)):
+        return op.opts['fn'](l, r)
+
+    if op in _VEC_OPS:
+        return op.opts['fn'](l, r)
+    elif op in (BinaryOp.IN, BinaryOp.NOTIN) and not _is_vec(l) and r.dtype.kind == 'U':
+        found = np.char.find(r, l) >= 0
+        return found if op == BinaryOp.IN else ~found
+
+    # the remaining binary ops are all predicates
+    return _elementwise(op.opts['fn'], l, r).astype(bool)
+
+
+@_handles(LogicAndExp, LogicOrExp)
+def _ex_logic(node, cols, sel):
+    # as the left-folded binary chain: ((a and b) and c)
+    operands = node.operands
+    l = _ex(operands[0], cols, sel)
+    for operand in operands[1:]:
+        l = _logic_step(node._stop, l, operand, cols, sel)
+
+    return l
+
+
+def _logic_step(stop, l, r, cols, sel):
+    """`l and r` (`stop` False) or `l or r` (True), `l` already evaluated."""
+    if not _is_vec(l):
+        return l if bool(l) is stop else _ex(r, cols, sel)
+
+    todo = _truth(l) if not stop else ~_truth(l)
+    if not todo.any():
+        return l
+    elif todo.all():
+        return _ex(r, cols, sel)
+
+    return _merge(todo, _ex(r, cols, sel[todo]), l[~todo])
+
+
+@_handles(CondExp)
+def _ex_cond(node, cols, sel):
+    cond = _ex(node.cond, cols, sel)
+    if not _is_vec(cond):
+        return _ex(node.yes if cond else node.no, cols, sel)
+
+    yes = _truth(cond)
+    if yes.all():
+        return _ex(node.yes, cols, sel)
+    elif not yes.any():
+        return _ex(node.no, cols, sel)
+
+    return _merge(yes, _ex(node.yes, cols, sel[yes]), _ex(node.no, cols, sel[~yes]))
+# }}} handlers
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Per-node profiling of expression evaluation, EXPLAIN ANALYZE style.
+
+`Profiler` evaluates an instrumented copy of a tree, so evaluating the
+original tree through `ex()` or `compile()` pays nothing for it::
+
+    prof = Profiler(parser.parse(expr))
+    for ctx in contexts:
+        prof.ex(ctx)
+
+    print(json.dumps(prof.ast(), indent=2))     # ast() plus a '$profile' per node
+    print(prof.collapsed())                     # input for flamegraph.pl
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+
+try:
+    from time import perf_counter as timer
+except ImportError:     # py2
+    from time import time as timer
+
+from .nodes import Node, LogicExp
+
+
+class Profiler(object):
+    def __init__(self, node):
+        self.root = _Probe(node, None)
+
+    def ex(self, ctx):
+        return self.root.ex(ctx)
+
+    def ast(self):
+        return self.root.ast()
+
+    def collapsed(self):
+        """One `frame;frame;... self-microseconds` line per node."""
+        lines = []
+
+        def walk(probe, stack):
+            stack = stack + [probe.frame()]
+            lines.append('{} {}'.format(';'.join(stack), int(round(probe.self_time() * 1e6))))
+            for child in probe.probes:
+                walk(child, stack)
+
+        walk(self.root, [])
+        return '\n'.join(lines)
+
+
+class _Probe(Node):
+    """Stands in for `node` in the instrumented tree and records its evaluations."""
+
+    def __init__(self, node, parent):
+        self.parent = parent
+        self.calls = 0
+        self.total = 0.0
+        self.skips = 0
+        self._reached = 0   # the parent's `calls` when this node was last evaluated
+
+        children = node.children()
+        if isinstance(node, LogicExp) and len(children) > 2:
+            # one probe per level of the chain, as nested by ast()
+            children = [node.l, node.r]
+        self.probes = [_Probe(child, self) for child in children]
+        self.node = node.with_children(self.probes) if self.probes else node
+
+    def ex(self, ctx):
+        self.calls += 1
+        if self.parent is not None:
+            self._reached = self.parent.calls
+
+        start = timer()
+        try:
+            val = self.node.ex(ctx)
+        finally:
+            self.total += timer() - start
+
+        # an evaluation that raised is no short-circuit
+        for child in self.probes:
+            if child._reached != self.calls:
+                child.skips += 1
+
+        return val
+
+    def self_time(self):
+        return self.total - sum(child.total for child in self.probes)
+
+    def skipped(self):
+        """Evaluations of the parent that completed without getting to this node."""
+        return self.skips
+
+    def frame(self):
+        op = getattr(self.node, 'op', None)
+        name = self.node.__class__.__name__
+
+        return '{}({})'.format(name, op.txt) if op is not None else name
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'total': self.total,
+            'self': self.self_time(),
+            'skipped': self.skipped(),
+        }
+
+    def ast(self):
+        ast = self.node.ast()
+        ast['$profile'] = self.stats()
+
+        return ast
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Grako-free parser engine for yep expressions.
+
+A single regex splits the text into tokens and a precedence-climbing parser
+builds `yepr.nodes` trees straight from them.  It accepts exactly the language
+of `grammar/yep.grako` and produces the same trees as the grako engine.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+import re
+
+from .nodes import (
+    UnaryOp, LogicOp, BinaryOp, EqOp,
+    LiteralString, LiteralNumber, LiteralRegex, Identifier,
+    UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+class ParseError(Exception):
+    def __init__(self, msg, text, pos):
+        super(ParseError, self).__init__('{} at {}: {!r}'.format(msg, pos, text[pos:pos + 20]))
+        self.msg, self.text, self.pos = msg, text, pos
+
+    def __reduce__(self):
+        # sent back from the worker processes of Parser.parse_many()
+        return self.__class__, (self.msg, self.text, self.pos)
+
+
+# Tokenizer {{{
+_KW = (
+    'return', 'def', 'sub', 'func', 'do', 'end', 'if', 'elif', 'else',
+    'for', 'while', 'repeat', 'until', 'next', 'break', 'continue',
+    'var', 'goto', 'with', 'true', 'false', 'nil', 'null', 'undef',
+    'not', 'and', 'or', 'isa', 'is', 'in', 'eq', 'ne', 'gt', 'ge', 'lt', 'le',
+)
+
+# Alternatives are tried in order, so longer operators come first.  A word
+# operator must end on a word boundary, which is what grako's nameguard plus
+# the trailing /\b/ of the grammar amount to.
+_TOKEN_RE = re.compile(
+    r'\s*(?:'
+    r'(?P<op>\|\||&&|==|!=|=~|!~|<=|>=|<|>'
+    r'|(?:or|and|eq|ne|isa|le|lt|ge|gt)\b'
+    r'|is +\s*not\b|not +\s*in\b|is\b|in\b)'
+    r'|(?P<unary>!|not\b|\+|-|#)'
+    r'|(?P<punct>[()?:])'
+    r'|(?P<number>\d+)'
+    r'|\$(?P<ident>[A-Za-z_][A-Za-z_0-9]*(?:\.[A-Za-z_0-9]+)*)'
+    r'|/(?P<regex>(?:[^/\\\n]|\\.)+)/(?P<flags>[imsx]*)(?![A-Za-z_0-9])'
+    r'|(?P<string>(?!(?:' + '|'.join(_KW) + r')\b)[A-Za-z_](?:[A-Za-z_0-9.-]*[A-Za-z_])?)'
+    r'|"(?P<dq>[^"\\]*(?:\\.[^"\\]*)*)"'
+    r"|'(?P<sq>[^'\\]*(?:\\.[^'\\]*)*)'"
+    r')',
+    re.UNICODE,
+)
+_SPACE_RE = re.compile(r'\s*', re.UNICODE)
+
+_OPS = dict(
+    [(t, op) for cls in (BinaryOp, EqOp, LogicOp) for t, op in cls._tokens.items()]
+)
+_UNARY_OPS = UnaryOp._tokens
+
+# op -> (precedence, node class), higher binds tighter
+_BINARY = {}
+for _op in (LogicOp.OR,):
+    _BINARY[_op] = (0, LogicOrExp)
+for _op in (LogicOp.AND,):
+    _BINARY[_op] = (1, LogicAndExp)
+for _op in set(EqOp._tokens.values()):
+    _BINARY[_op] = (2, EqExp)
+for _op in set(BinaryOp._tokens.values()):
+    _BINARY[_op] = (3, BinaryExp)
+
+_OPERAND, _OP, _UNARY, _PUNCT, _END = range(5)
+
+
+def tokenize(text):
+    """Split `text` into a list of `(kind, value, pos)` tuples ending with `_END`."""
+    tokens = []
+    append = tokens.append
+    match = _TOKEN_RE.match
+    end = len(text)
+    pos = 0
+
+    while True:
+        m = match(text, pos)
+        if m is None:
+            pos = _SPACE_RE.match(text, pos).end()
+            if pos == end:
+                break
+            raise ParseError('unexpected character', text, pos)
+
+        kind = m.lastgroup
+        start = m.start(kind)
+        if kind == 'op':
+            append((_OP, _OPS[' '.join(m.group(kind).split())], start))
+        elif kind == 'unary':
+            append((_UNARY, _UNARY_OPS[m.group(kind)], start))
+        elif kind == 'punct':
+            append((_PUNCT, m.group(kind), start))
+        elif kind == 'number':
+            append((_OPERAND, LiteralNumber(m.group(kind)), start))
+        elif kind == 'ident':
+            append((_OPERAND, Identifier(m.group(kind)), start - 1))
+        elif kind == 'flags':
+            # the last group of a regex literal
+            start = m.start('regex') - 1
+            try:
+                append((_OPERAND, LiteralRegex(m.group('regex'), m.group(kind)), start))
+            except re.error as e:
+                raise ParseError('invalid regex ({})'.format(e), text, start)
+        else:
+            append((_OPERAND, LiteralString(m.group(kind)), start))
+        pos = m.end()
+
+    append((_END, None, end))
+    return tokens
+# }}} Tokenizer
+
+
+# Parser {{{
+class FastParser(object):
+    def parse(self, text):
+        return _Parse(text).yep()
+
+
+class _Parse(object):
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def error(self, msg):
+        raise ParseError(msg, self.text, self.tokens[self.pos][2])
+
+    def expect(self, punct):
+        kind, val, _ = self.tokens[self.pos]
+        if kind != _PUNCT or val != punct:
+            self.error('expecting "{}"'.format(punct))
+        self.pos += 1
+
+    def yep(self):
+        node = self.expression()
+        if self.tokens[self.pos][0] != _END:
+            self.error('expecting end of text')
+        return node
+
+    def expression(self):
+        cond = self.binary(0)
+
+        kind, val, _ = self.tokens[self.pos]
+        if kind != _PUNCT or val != '?':
+            return cond
+
+        self.pos += 1
+        yes = self.expression()
+        self.expect(':')
+        no = self.expression()
+        return CondExp(cond, yes, no)
+
+    def binary(self, min_prec):
+        l = self.unary()
+        tokens = self.tokens
+
+        while True:
+            kind, op, _ = tokens[self.pos]
+            if kind != _OP:
+                return l
+
+            prec, cls = _BINARY[op]
+            if prec < min_prec:
+                return l
+
+            self.pos += 1
+            if cls not in (LogicOrExp, LogicAndExp):
+                l = cls(op, l, self.binary(prec + 1))
+                continue
+
+            # the whole `a or b or c` chain, as one n-ary node
+            operands = [l, self.binary(prec + 1)]
+            while tokens[self.pos][0] == _OP and _BINARY[tokens[self.pos][1]][1] is cls:
+                self.pos += 1
+                operands.append(self.binary(prec + 1))
+            l = cls(op, *operands)
+
+    def unary(self):
+        kind, val, _ = self.tokens[self.pos]
+        self.pos += 1
+
+        if kind == _OPERAND:
+            return val
+        elif kind == _UNARY:
+            return UnaryExp(op=val, exp=self.unary())
+        elif kind == _PUNCT and val == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+
+        self.pos -= 1
+        self.error('expecting expression')
+# }}} Parser
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""The grako-generated parser, with its memo made tunable.
+
+Kept apart from `yepr.parser` so that grako is only imported by processes
+that parse with it.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from .yep_grako import yepParser
+
+
+class _RuleMemo(dict):
+    """grako's memo table, only keeping the results of some rules."""
+
+    def __init__(self, rules):
+        super(_RuleMemo, self).__init__()
+        self.rules = rules
+
+    def __setitem__(self, key, val):
+        # key: (position, rule method, state)
+        if key[1].__name__ in self.rules:
+            super(_RuleMemo, self).__setitem__(key, val)
+
+
+class GrakoParser(yepParser):
+    def __init__(self, memoize=True, **kwargs):
+        if memoize not in (True, False):
+            # generated methods are named `_rule_`
+            memoize = frozenset('_{}_'.format(rule) for rule in memoize)
+        self.memoize = memoize
+
+        super(GrakoParser, self).__init__(**kwargs)
+
+    def _initialize_caches(self):
+        super(GrakoParser, self)._initialize_caches()
+        self._clear_cache()
+
+    def _clear_cache(self):
+        super(GrakoParser, self)._clear_cache()
+        if self.memoize not in (True, False):
+            self._memoization_cache = _RuleMemo(self.memoize)
+
+    def _memoization(self):
+        return self.memoize is not False and super(GrakoParser, self)._memoization()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Keep the values of many expressions up to date with a changing context.
+
+    live = Incremental({'admin': '$user.role == "admin"', 'big': '#$cart > 10'}, ctx)
+    live.values                     # {'admin': False, 'big': True}
+    live.update('cart', [])         # {'big': False}: the rules whose value changed
+
+Every subtree remembers its last value, and which top-level context keys it
+reads (its `$name` roots).  `update(key, value)` forgets the values of the
+subtrees reading `key` and evaluates again only the rules containing one,
+the other subtrees answering from memory.  Equal subtrees are shared between
+rules, as in `RuleSet`.  Values must be changed through `update()`:
+changes made inside a value already in the context go unnoticed.
+
+Node classes from outside this module's `_handlers` may read anything from
+the context: their rules are evaluated again on every update.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+
+from .nodes import (
+    EqOp, Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull,
+    LiteralRegex, Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+from .ruleset import RuleSet
+
+
+_missing = object()
+
+
+class Incremental(object):
+    def __init__(self, rules=(), ctx=None, parser=None):
+        """`rules`: a mapping or `(name, expr)` pairs, expr being text or a tree."""
+        rules = RuleSet(rules, parser)
+        self.names = rules.names
+        self.roots = rules.roots
+        self.ctx = dict(ctx or {})
+
+        self._memo = {}         # id(node) -> last value
+        self._readers = {}      # context key -> [id(node)] of the subtrees reading it
+        self._rule_keys = {}    # context key -> [rule position]
+        self._opaque = []       # id(node) of the subtrees that may read any key
+        self._opaque_rules = []
+
+        deps = {}
+        for i, root in enumerate(self.roots):
+            keys = self._deps(root, deps)
+            if keys is None:
+                self._opaque_rules.append(i)
+            else:
+                for key in keys:
+                    self._rule_keys.setdefault(key, []).append(i)
+
+        for node_id, keys in deps.items():
+            if keys is None:
+                self._opaque.append(node_id)
+            else:
+                for key in keys:
+                    self._readers.setdefault(key, []).append(node_id)
+
+        self.values = {}
+        self._unreported = {}   # changes made by a refresh that raised
+        self._pending = set(range(len(self.roots)))
+        self._refresh()
+
+    def _deps(self, node, deps):
+        """Context keys read under `node`, None for any; fills `deps` for the whole subtree."""
+        keys = deps.get(id(node), _missing)
+        if keys is not _missing:
+            return keys
+
+        if type(node) not in _handlers:
+            keys = None
+        elif type(node) is Identifier:
+            keys = frozenset([node.keys[0]])
+        else:
+            keys = frozenset()
+            for child in node.children():
+                child = self._deps(child, deps)
+                # keep walking: the children are shared with other rules
+                keys = None if keys is None or child is None else keys | child
+
+        deps[id(node)] = keys
+        return keys
+
+    def update(self, key, value):
+        """Set `ctx[key]`, returns name -> new value for the rules whose value changed."""
+        self.ctx[key] = value
+        return self._changed(key)
+
+    def delete(self, key):
+        """Remove `key` from the context, `$key` reads None from now on."""
+        self.ctx.pop(key, None)
+        return self._changed(key)
+
+    def _changed(self, key):
+        memo = self._memo
+        for node_id in self._readers.get(key, ()):
+            memo.pop(node_id, None)
+        for node_id in self._opaque:
+            memo.pop(node_id, None)
+
+        self._pending.update(self._rule_keys.get(key, ()))
+        self._pending.update(self._opaque_rules)
+        return self._refresh()
+
+    def _refresh(self):
+        """Evaluate the pending rules; one that raises stays pending for the next update.
+
+        The changes of the rules evaluated before it are returned by the
+        next refresh that succeeds.
+        """
+        # kept across calls as it is filled: an exception leaves it in place
+        changed = self._unreported
+        for i in sorted(self._pending):
+            name, val = self.names[i], self._ex(self.roots[i])
+            self._pending.discard(i)
+
+            old = self.values.get(name, _missing)
+            if old is _missing or type(old) is not type(val) or old != val:
+                self.values[name] = changed[name] = val
+
+        self._unreported = {}
+        return changed
+
+    def _ex(self, node):
+        """Value of `node`, a subtree of one of the rules, from memory when still valid."""
+        val = self._memo.get(id(node), _missing)
+        if val is _missing:
+            handler = _handlers.get(type(node))
+            val = handler(self, node) if handler is not None else node.ex(self.ctx)
+            self._memo[id(node)] = val
+
+        return val
+
+
+_handlers = {}
+
+
+def _handles(*classes):
+    def deco(fn):
+        for cls in classes:
+            _handlers[cls] = fn
+        return fn
+
+    return deco
+
+
+# handlers {{{
+@_handles(Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex)
+def _ex_literal(inc, node):
+    return node.ex(None)
+
+
+@_handles(Identifier)
+def _ex_identifier(inc, node):
+    return node.get(inc.ctx)
+
+
+@_handles(UnaryExp)
+def _ex_unary(inc, node):
+    return node.op.opts['fn'](inc._ex(node.exp))
+
+
+@_handles(BinaryExp)
+def _ex_binary(inc, node):
+    return node.op.opts['fn'](inc._ex(node.l), inc._ex(node.r))
+
+
+@_handles(EqExp)
+def _ex_eq(inc, node):
+    if node.pat is None:
+        return _ex_binary(inc, node)
+
+    found = node.pat.search(inc._ex(node.l))
+    return bool(found) if node.op == EqOp.RE else not found
+
+
+@_handles(LogicAndExp, LogicOrExp)
+def _ex_logic(inc, node):
+    stop = node._stop
+    for operand in node.operands:
+        val = inc._ex(operand)
+        if bool(val) is stop:
+            break
+
+    return val
+
+
+@_handles(CondExp)
+def _ex_cond(inc, node):
+    return inc._ex(node.yes if inc._ex(node.cond) else node.no)
+# }}} handlers
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Pick the few rules of a large collection that can match a context.
+
+Most rules are conjunctions that pin a field to a constant::
+
+    region == "eu" and tier >= 2
+    region == "us" and (plan == "pro" or plan == "team")
+
+`RuleIndex` pulls those required tests out of each rule's `and` chain and
+files the rule in a hash table under the tested value: the first rule under
+`region` -> "eu", the second under `plan` -> "pro" and "team".  Evaluation
+computes each indexed key once, looks its value up and only runs the rules
+found there, plus the rules nothing could be extracted from.
+
+Required tests understood, alone or or'ed together on the same key:
+
+    key == literal      literal == key      key in "literal"
+
+`key` is any subtree other than a literal; rules share a table when their
+keys are structurally equal.  A rule left out by the index would have
+evaluated to a false value (or, for `in` against a value that is not a
+string, raised), so `match()` is exact.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+
+from .nodes import (
+    Node, BinaryOp, EqOp, Literal, LiteralString, LiteralNumber,
+    BinaryExp, EqExp, LogicOrExp, LogicAndExp,
+)
+
+
+# `key in "..."` is filed under every substring, for short strings only
+MAX_IN_LENGTH = 32
+
+
+def conjuncts(node):
+    """The operands of an `and` chain, `node` itself if it is none."""
+    out, todo = [], [node]
+    while todo:
+        node = todo.pop()
+        if type(node) is LogicAndExp:
+            todo.extend(reversed(node.operands))
+        else:
+            out.append(node)
+
+    return out
+
+
+def _substrings(s):
+    return set(s[i:j] for i in range(len(s) + 1) for j in range(i, len(s) + 1))
+
+
+def constraint(node):
+    """`(key, values)` if `node` can only be true when `key` is one of `values`, else None."""
+    if type(node) is LogicOrExp:
+        found = [constraint(operand) for operand in node.operands]
+        if all(found) and all(c[0] == found[0][0] for c in found):
+            return found[0][0], frozenset().union(*(c[1] for c in found))
+
+    elif type(node) is EqExp and node.op == EqOp.EQ:
+        key, val = node.l, node.r
+        if isinstance(key, Literal):
+            key, val = val, key
+
+        if type(val) in (LiteralString, LiteralNumber) and not isinstance(key, Literal):
+            return key, frozenset([val.ex(None)])
+
+    elif type(node) is BinaryExp and node.op == BinaryOp.IN:
+        key, val = node.l, node.r
+        if (type(val) is LiteralString and len(val.val) <= MAX_IN_LENGTH
+                and not isinstance(key, Literal)):
+            return key, frozenset(_substrings(val.val))
+
+    return None
+
+
+class RuleIndex(object):
+    def __init__(self, rules=(), parser=None):
+        """`rules`: a mapping or `(name, expr)` pairs, expr being text or a tree."""
+        self.parser = parser
+        self.names = []
+        self._fns = []
+
+        self._keys = []         # [(key node, compiled key, {value: [rule id]}, [rule id])]
+        self._key_pos = {}      # key node -> position in _keys
+        self._scan = []         # rules without any usable constraint
+
+        for name, expr in (rules.items() if hasattr(rules, 'items') else rules):
+            self.add(name, expr)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, expr):
+        if not isinstance(expr, Node):
+            if self.parser is None:
+                from .parser import Parser
+                self.parser = Parser()
+            expr = self.parser.parse(expr)
+
+        rule_id = len(self.names)
+        self.names.append(name)
+        self._fns.append(expr.compile())
+
+        found = [c for c in map(constraint, conjuncts(expr)) if c is not None]
+        if not found:
+            self._scan.append(rule_id)
+            return
+
+        # the fewer values, the fewer contexts the rule is a candidate for
+        key, values = min(found, key=lambda c: len(c[1]))
+
+        pos = self._key_pos.get(key)
+        if pos is None:
+            pos = self._key_pos[key] = len(self._keys)
+            self._keys.append((key, key.compile(), {}, []))
+
+        _, _, table, ids = self._keys[pos]
+        ids.append(rule_id)
+        for val in values:
+            table.setdefault(val, []).append(rule_id)
+
+    def candidates(self, ctx):
+        """Ids of the rules that may be true for `ctx`, in the order they were added."""
+        ids = list(self._scan)
+        for _, fn, table, all_ids in self._keys:
+            try:
+                found = table.get(fn(ctx))
+            except Exception:
+                # unhashable value, or the key fails: let the rules decide
+                found = all_ids
+
+            if found:
+                ids.extend(found)
+
+        ids.sort()
+        return ids
+
+    def ex(self, ctx):
+        """name -> value for the candidate rules only."""
+        fns, names = self._fns, self.names
+        return dict((names[i], fns[i](ctx)) for i in self.candidates(ctx))
+
+    def match(self, ctx):
+        """Names of the rules that are true for `ctx`."""
+        fns, names = self._fns, self.names
+        return [names[i] for i in self.candidates(ctx) if fns[i](ctx)]
+
+    def info(self):
+        return {
+            'rules': len(self.names),
+            'keys': len(self._keys),
+            'indexed': len(self.names) - len(self._scan),
+            'scan': len(self._scan),
+        }
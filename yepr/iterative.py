@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Evaluate trees of any depth with an explicit stack instead of recursion.
+
+`ex()` recurses once per tree level, so deeply nested expressions, e.g.
+generated ones, hit Python's recursion limit.  `ex_iterative(node, ctx)`
+gives the same values (and raises the same errors) using a single frame:
+
+    node.ex_iterative(ctx)
+
+Node classes it does not know are evaluated with their own `ex(ctx)`.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from .nodes import (
+    EqOp, Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull,
+    LiteralRegex, Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+# what a node needs once its first operand value is known
+_EVAL, _UNARY, _BINARY_L, _BINARY, _SEARCH, _LOGIC, _COND = range(7)
+
+_LITERALS = (Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex)
+
+
+def ex_iterative(node, ctx):
+    # todo: (step, node, extra) instructions; vals: operand values
+    todo, vals = [(_EVAL, node, None)], []
+    push, pop = todo.append, todo.pop
+
+    while todo:
+        step, node, extra = pop()
+
+        if step == _EVAL:
+            cls = type(node)
+            if cls is Identifier:
+                vals.append(node.get(ctx))
+            elif cls in _LITERALS:
+                vals.append(node.ex(None))
+            elif cls is LogicOrExp or cls is LogicAndExp:
+                push((_LOGIC, node, 0))
+                push((_EVAL, node.operands[0], None))
+            elif cls is EqExp and node.pat is not None:
+                push((_SEARCH, node, None))
+                push((_EVAL, node.l, None))
+            elif cls is BinaryExp or cls is EqExp:
+                push((_BINARY_L, node, None))
+                push((_EVAL, node.l, None))
+            elif cls is UnaryExp:
+                push((_UNARY, node, None))
+                push((_EVAL, node.exp, None))
+            elif cls is CondExp:
+                push((_COND, node, None))
+                push((_EVAL, node.cond, None))
+            else:
+                vals.append(node.ex(ctx))
+
+        elif step == _UNARY:
+            vals.append(node.op.opts['fn'](vals.pop()))
+        elif step == _BINARY_L:
+            # keep the left value on `vals` while the right one is computed
+            push((_BINARY, node, None))
+            push((_EVAL, node.r, None))
+        elif step == _BINARY:
+            r = vals.pop()
+            vals.append(node.op.opts['fn'](vals.pop(), r))
+        elif step == _SEARCH:
+            found = node.pat.search(vals.pop())
+            vals.append(bool(found) if node.op == EqOp.RE else not found)
+        elif step == _LOGIC:
+            operands, i = node.operands, extra + 1
+            # the last value computed is the chain's unless another operand follows
+            if i < len(operands) and bool(vals[-1]) is not node._stop:
+                vals.pop()
+                push((_LOGIC, node, i))
+                push((_EVAL, operands[i], None))
+        else:
+            push((_EVAL, node.yes if vals.pop() else node.no, None))
+
+    val, = vals
+    return val
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Find which of many keywords a text contains, in one pass (Aho-Corasick).
+
+    words = KeywordSet(['select', 'union', '<script'])
+    words.search('1 union select 2')    # [True, True, False]
+
+Keywords and text are compared as utf-8 bytes, a string containing another
+iff its encoding does.  The automaton is a table DFA over the bytes used by
+the keywords, its accepting states numbered last: a scan is one
+`bytes.translate()` then two list lookups and a comparison per byte.
+
+That loop still runs in Python, some 100 times slower per byte than the C
+search behind `in`: one pass pays off from about `MIN_KEYWORDS` keywords.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object, bytes
+
+
+# measured break-even against one `in` per keyword, whatever the text length
+MIN_KEYWORDS = 128
+
+_text = type('')
+
+
+class KeywordSet(object):
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        encoded = [k.encode('utf-8') for k in self.keywords]
+
+        # bytes -> symbols 1..n, 0 for the bytes no keyword uses
+        used = sorted(set(b for k in encoded for b in bytearray(k)))
+        symbol = dict((b, i) for i, b in enumerate(used, 1))
+        self._table = bytes(bytearray(symbol.get(b, 0) for b in range(256)))
+        width = len(used) + 1
+
+        # the trie
+        goto, out = [[0] * width], [()]
+        self._empty = []
+        for i, key in enumerate(encoded):
+            if not key:
+                self._empty.append(i)   # in any text
+                continue
+
+            state = 0
+            for b in bytearray(key):
+                nxt = goto[state][symbol[b]]
+                if not nxt:
+                    nxt = goto[state][symbol[b]] = len(goto)
+                    goto.append([0] * width)
+                    out.append(())
+                state = nxt
+            out[state] += (i,)
+
+        # breadth first, the row of a state completed from its failure state's
+        rows = [None] * len(goto)
+        rows[0] = list(goto[0])
+        fail = [0] * len(goto)
+        queue = [s for s in goto[0] if s]
+        for state in queue:
+            row = list(rows[fail[state]])
+            for sym, nxt in enumerate(goto[state]):
+                if nxt:
+                    fail[nxt] = rows[fail[state]][sym]
+                    row[sym] = nxt
+                    queue.append(nxt)
+            rows[state] = row
+            out[state] += out[fail[state]]
+
+        # renumbered, accepting states last
+        order = [s for s in range(len(goto)) if not out[s]]
+        self._first_accepting = len(order)
+        order += [s for s in range(len(goto)) if out[s]]
+
+        number = [0] * len(order)
+        for new, old in enumerate(order):
+            number[old] = new
+        self._rows = [[number[s] for s in rows[old]] for old in order]
+        self._out = [out[old] for old in order]
+
+    def search(self, text):
+        """Per keyword, in order, whether `keyword in text`."""
+        if type(text) is not _text:
+            raise TypeError('keywords are searched for in text, not {}'.format(type(text).__name__))
+
+        rows, first = self._rows, self._first_accepting
+        hits = set()
+        add = hits.add
+
+        state = 0
+        for b in bytearray(text.encode('utf-8').translate(self._table)):
+            state = rows[state][b]
+            if state >= first:
+                add(state)
+
+        found = [False] * len(self.keywords)
+        for i in self._empty:
+            found[i] = True
+        for state in hits:
+            for i in self._out[state]:
+                found[i] = True
+
+        return found
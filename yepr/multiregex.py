@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Match one string against many start-anchored regexes in a single call.
+
+    multi = MultiPattern([re.compile('^GET '), re.compile('^/api/', re.I), re.compile('bot')])
+    multi.search('GET /robots.txt')     # [True, False, True]
+
+`re` has no set matching (as RE2's `RE2::Set`), and an alternation of
+patterns is searched for without the literal prefix scan each pattern gets
+on its own, typically ten to a hundred times slower.  Patterns anchored at
+the start of the string (`^...`, `\\A...`) only ever need trying at position
+0 though: they become lookaheads of one regex, `(?:(?=(?P<p0>pat0))|)...`,
+each named group being set iff that pattern matches, for the price of a
+single `match()` call.
+
+Other patterns, and those that would mean something else once embedded
+(backreferences, named groups, conditionals, global inline flags, flags
+other than i/m/s, bytes patterns), are searched for on their own.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object, str
+import re
+
+
+# constructs tied to the pattern's own group numbers or to the whole regex
+_UNSUPPORTED = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)')
+
+_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+
+def _top_level_branch(text):
+    """Whether `text` has a `|` outside of any group or character class."""
+    depth, i, in_class = 0, 0, False
+    while i < len(text):
+        c = text[i]
+        if c == '\\':
+            i += 1
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+            # a `]` right after `[` or `[^` is a literal
+            if text[i + 1:i + 2] == '^':
+                i += 1
+            if text[i + 1:i + 2] == ']':
+                i += 1
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and not depth:
+            return True
+        i += 1
+
+    return False
+
+
+def anchored(pattern):
+    """Whether `pattern` can only match at the start of the string."""
+    text = pattern.pattern
+    if text.startswith('\\A'):
+        pass
+    elif not text.startswith('^') or pattern.flags & re.MULTILINE:
+        return False
+
+    return not _top_level_branch(text)
+
+
+def embeddable(pattern):
+    """`pattern` as a group to embed in a bigger regex, None if it cannot be."""
+    text = pattern.pattern
+    if not isinstance(text, str) or pattern.groupindex or _UNSUPPORTED.search(text):
+        return None
+
+    flags, letters = pattern.flags & ~re.UNICODE, ''
+    for bit, letter in _FLAGS:
+        if flags & bit:
+            flags &= ~bit
+            letters += letter
+    if flags:
+        return None     # verbose, ascii, locale...
+
+    return '(?{}:{})'.format(letters, text) if letters else '(?:{})'.format(text)
+
+
+def mergeable(pattern):
+    return anchored(pattern) and embeddable(pattern) is not None
+
+
+class MultiPattern(object):
+    def __init__(self, patterns):
+        """`patterns`: compiled regexes."""
+        self.patterns = list(patterns)
+
+        parts, merged = [], []
+        for i, pattern in enumerate(self.patterns):
+            if mergeable(pattern):
+                parts.append('(?:(?=(?P<p{}>{}))|)'.format(i, embeddable(pattern)))
+                merged.append(i)
+
+        self.regex = None
+        if len(parts) > 1:
+            try:
+                self.regex = re.compile(''.join(parts))
+            except (re.error, OverflowError, RuntimeError):
+                pass    # too many groups for this python...
+
+        if self.regex is None:
+            merged = []
+
+        # (position, index in match.groups()) for the merged patterns
+        self._merged = [(i, self.regex.groupindex['p{}'.format(i)] - 1) for i in merged]
+        self._separate = [(i, p.search) for i, p in enumerate(self.patterns) if i not in merged]
+
+    def search(self, text):
+        """Per pattern, in order, whether `pattern.search(text)` finds a match."""
+        found = [False] * len(self.patterns)
+        if self._merged:
+            groups = self.regex.match(text).groups()
+            for i, group in self._merged:
+                found[i] = groups[group] is not None
+
+        for i, search in self._separate:
+            found[i] = search(text) is not None
+
+        return found
@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
-from future.utils import with_metaclass
 
 from builtins import str
 from builtins import object
 
 from sys import version_info
+import copy
+import operator
 import re
 
+from .cache import LRUCache
+
 
 class Base(object):
+    # trees of a few hundred thousand rules stay resident, so nodes and
+    # tokens carry no per-instance __dict__
+    __slots__ = ()
+
     if version_info >= (3,):
         # Don't return the "bytes" type from Python 3's __str__:
         def __str__(self):
@@ -22,6 +29,21 @@ class Base(object):
 
 
 
+def with_metaclass(meta, *bases):
+    """`future.utils.with_metaclass`, without importing `future` for it."""
+    class metaclass(meta):
+        __call__ = type.__call__
+        __init__ = type.__init__
+
+        def __new__(cls, name, this_bases, d):
+            if this_bases is None:
+                return type.__new__(cls, name, (), d)
+            return meta(name, bases, d)
+
+    # class names are native strings
+    return metaclass(b'temporary_class' if version_info < (3,) else 'temporary_class', None, {})
+
+
 # Token {{{
 class TokenMeta(type):
     def __new__(mcs, name, bases, attrs):
@@ -39,6 +61,7 @@ class TokenMeta(type):
         for obj_name, obj in list(attrs.items()):
             if isinstance(obj, Token):
                 obj.p = new_class   # for output token's base
+                obj.name = obj_name
                 for txt in [obj.txt] + obj.alias:
                     if txt in _tokens:
                         raise ValueError('token "{}" txt/alias "{}" conflict with "{}"'.format(
@@ -52,6 +75,8 @@ class TokenMeta(type):
 
 
 class Token(with_metaclass(TokenMeta, Base)):
+    __slots__ = ('id', 'txt', 'alias', 'opts', 'p', 'name')
+
     # class var {{{
     _next_id = 1
     _token_map = {}
@@ -72,6 +97,19 @@ class Token(with_metaclass(TokenMeta, Base)):
     def parse(cls, txt):
         return cls._tokens[txt]
 
+    def __reduce__(self):
+        # ops are compared by identity: pickle and copy as the very same token
+        return getattr, (self.p, self.name)
+
+    @staticmethod
+    def from_str(s):
+        """Inverse of `str(token)`, e.g. '<LogicOp(&&)>' -> LogicOp.AND"""
+        m = re.match(r'^<(\w+)\((.+)\)>$', s)
+        if not m or m.group(1) not in _token_classes:
+            raise ValueError('not a token: {!r}'.format(s))
+
+        return _token_classes[m.group(1)].parse(m.group(2))
+
     def __unicode__(self):
         return u'<{}({})>'.format(
             self.p.__name__,
@@ -79,44 +117,78 @@ class Token(with_metaclass(TokenMeta, Base)):
         )
 
 
+# patterns of =~ / !~ only known at evaluation time; literal ones are
+# compiled by EqExp itself.  Use `regex_cache.resize(n)` to tune.
+regex_cache = LRUCache(4096)
+
+
+_Pattern = type(re.compile(''))
+
+
+def compile_regex(pat):
+    if isinstance(pat, _Pattern):
+        return pat  # a regex literal's value, compiled already
+    return regex_cache.get_or_create(pat, re.compile)
+
+
+# op implementations, bound to tokens as `fn` for Node.compile()
+def _op_in(l, r):
+    return l in r
+
+def _op_notin(l, r):
+    return l not in r
+
+def _op_re(l, r):
+    return bool(compile_regex(r).search(l))
+
+def _op_nr(l, r):
+    return not compile_regex(r).search(l)
+
+
 class UnaryOp(Token):
-    NOT = Token('!', 'not')
-    PLUS = Token('+')
-    MINUS = Token('-')
-    HASH = Token('#')
+    NOT = Token('!', 'not', fn=operator.not_)
+    PLUS = Token('+', fn=operator.pos)
+    MINUS = Token('-', fn=operator.neg)
+    HASH = Token('#', fn=len)
 
 class LogicOp(Token):
     AND = Token('&&', 'and')
     OR = Token('||', 'or')
 
 class BinaryOp(Token):
-    LE = Token('<=', 'le')
-    LT = Token('<', 'lt')
-    GE = Token('>=', 'ge')
-    GT = Token('>', 'gt')
+    LE = Token('<=', 'le', fn=operator.le)
+    LT = Token('<', 'lt', fn=operator.lt)
+    GE = Token('>=', 'ge', fn=operator.ge)
+    GT = Token('>', 'gt', fn=operator.gt)
 
-    IN = Token('in')
-    NOTIN = Token('not in')
+    IN = Token('in', fn=_op_in)
+    NOTIN = Token('not in', fn=_op_notin)
 
 class EqOp(Token):
-    EQ = Token('==', 'eq')
-    NE = Token('!=', 'ne')
-    RE = Token('=~')
-    NR = Token('!~')
+    EQ = Token('==', 'eq', fn=operator.eq)
+    NE = Token('!=', 'ne', fn=operator.ne)
+    RE = Token('=~', fn=_op_re)
+    NR = Token('!~', fn=_op_nr)
 
-    ISA = Token('isa')
-    ISNOT = Token('is not')
-    IS = Token('is')
+    ISA = Token('isa', fn=isinstance)
+    ISNOT = Token('is not', fn=operator.is_not)
+    IS = Token('is', fn=operator.is_)
 
 class AsgnOp(Token):
     ASGN = Token(':=')
 
+
+_token_classes = dict((cls.__name__, cls) for cls in (UnaryOp, LogicOp, BinaryOp, EqOp, AsgnOp))
+
 # }}} Token
 
 
 
 # Syntax {{{
 class Node(Base):
+    __slots__ = ()
+    _fields = ()    # attributes holding child nodes, in evaluation order
+
     def __unicode__(self):
         return u'<{} at 0x{}>'.format(
             self.__class__.__name__,
@@ -135,12 +207,98 @@ class Node(Base):
     def ast_prop(self):
         return {}
 
+    def children(self):
+        """Child nodes, in evaluation order."""
+        return [getattr(self, name) for name in self._fields]
+
+    def with_children(self, children):
+        """Shallow copy of the node with `children` in place of its own."""
+        new = copy.copy(self)
+        for name, child in zip(self._fields, children):
+            setattr(new, name, child)
+
+        return new
+
+    def compile(self):
+        """Lower the tree into a plain `f(ctx)` callable.
+
+        Operators are resolved once here instead of on every `ex()`;
+        nodes without a specialised version fall back to `ex`.
+        """
+        return self.ex
+
+    def specialize(self, known_ctx=None):
+        """Return an equivalent, smaller tree with constant parts folded.
+
+        Subtrees that only depend on literals (or on `known_ctx`) are replaced
+        by their value, and/or/?: branches decided by them are pruned.  Nodes
+        that cannot be evaluated ahead of time are kept as they are.
+        """
+        return self
+
+    def ex_columns(self, cols, size=None):
+        """Evaluate for every row of `cols`, a dict of equally long arrays.
+
+        Returns a numpy array with one value per row, see `yepr.columnar`.
+        `size` gives the row count when `cols` is empty.
+        """
+        from .columnar import ex_columns
+
+        return ex_columns(self, cols, size)
+
+    def referenced_names(self):
+        """Top-level context keys the tree reads, e.g. {'user'} for `$user.geo.country`."""
+        names, todo = set(), [self]
+        while todo:
+            node = todo.pop()
+            if isinstance(node, Identifier):
+                names.add(node.keys[0])
+            todo.extend(node.children())
+
+        return names
+
+    def ex_iterative(self, ctx):
+        """`ex()` without recursion, for trees of any depth, see `yepr.iterative`."""
+        from .iterative import ex_iterative
+
+        return ex_iterative(self, ctx)
+
+    def ex_async(self, ctx):
+        """Coroutine evaluating with awaitable context values, see `yepr.aio`."""
+        from .aio import ex_async
+
+        return ex_async(self, ctx)
+
+    # structural equality: same class, same operator, equal literal values
+    # and equal children
+    def _key(self):
+        """What two nodes of the same class must share to be equal, None to compare by identity."""
+        return None
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        elif type(self) is not type(other):
+            return False
+
+        key = self._key()
+        return key is not None and key == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        key = self._key()
+        return object.__hash__(self) if key is None else hash((type(self), key))
+
 
 class Exp(Node):
-    pass
+    __slots__ = ()
 
 
 class Literal(Node):
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
@@ -159,41 +317,238 @@ class Literal(Node):
             'val': self.val,
         }
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(ast['val'])
+
+    def _key(self):
+        # 1 == 1.0 == True, yet they are different literals
+        val = self.ex(None)
+        return (type(val), val)
+
+    def compile(self):
+        val = self.ex(None)
+
+        return lambda ctx: val
+
 
 class LiteralString(Literal):
-    pass
+    __slots__ = ()
 
 class LiteralRegex(Literal):
-    def __init__(self, pat, flags):
-        raise NotImplementedError('LiteralRegex not ready for use')
+    """`/pat/flags`, its value the pattern compiled when the node is built.
+
+    `flags` is a string of `i`, `m`, `s` and `x`, as in Perl.
+    """
+    __slots__ = ('pat', 'flags')
+
+    FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
 
+    def __init__(self, pat, flags=''):
         self.pat, self.flags = pat, flags
-        self.val = '/{}/{}'.format(re.escape(pat), flags)   # for .ast_prop() & __unicode__
 
-    def ex(self, ctx):
-        return re.compile(self.pat, self.flags)
+        bits = 0
+        for flag in flags:
+            try:
+                bits |= self.FLAGS[flag]
+            except KeyError:
+                raise ValueError('unknown regex flag {!r}'.format(flag))
+        self.val = re.compile(pat, bits)
+
+    def __unicode__(self):
+        return u'<{} at 0x{}> /{}/{}'.format(
+            self.__class__.__name__,
+            id(self),
+            self.pat,
+            self.flags,
+        )
+
+    def ast_prop(self):
+        return {
+            'pat': self.pat,
+            'flags': self.flags,
+        }
+
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(ast['pat'], ast['flags'])
+
+    def _key(self):
+        return (self.pat, self.flags)
+
 
 class LiteralNumber(Literal):
+    __slots__ = ('num',)
+
+    def __init__(self, val):
+        self.val = val
+        # converted once; folded values are passed in as numbers already
+        if isinstance(val, str):
+            self.num = float(val) if ('.' in val) else int(val)
+        else:
+            self.num = val
+
     def ex(self, ctx):
-        return float(self.val) if ('.' in self.val) else int(self.val)
+        return self.num
 
 class LiteralTrue(Literal):
+    __slots__ = ()
     val = True
     def __init__(self):
         pass
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls()
+
 class LiteralFalse(Literal):
+    __slots__ = ()
     val = False
     def __init__(self):
         pass
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls()
+
 class LiteralNull(Literal):
+    __slots__ = ()
     val = None
     def __init__(self):
         pass
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls()
+
+
+def literal(val):
+    """Wrap a value computed ahead of time into the matching literal node."""
+    if val is True:
+        return LiteralTrue()
+    elif val is False:
+        return LiteralFalse()
+    elif val is None:
+        return LiteralNull()
+    elif isinstance(val, (int, float)):
+        return LiteralNumber(val)
+    elif isinstance(val, str):
+        return LiteralString(val)
+
+    return Literal(val)
+
+
+def _fold(node):
+    """Value of `node` if it is all literals, else `node` itself."""
+    try:
+        return literal(node.ex(None))
+    except Exception:
+        # leave it to fail at run time, as it would have without folding
+        return node
+
+
+def _step(key):
+    """Getter for one step of a dotted path: item, else attribute, else None."""
+    items = [operator.itemgetter(key)]
+    if key.isdigit():
+        items.insert(0, operator.itemgetter(int(key)))  # sequence index first
+    attr = operator.attrgetter(key)
+
+    def get(obj):
+        for item in items:
+            try:
+                return item(obj)
+            except (LookupError, TypeError):
+                pass
+
+        try:
+            return attr(obj)
+        except AttributeError:
+            return None
+
+    return get
+
+
+def _path_getter(keys):
+    root, items = keys[0], tuple(operator.itemgetter(key) for key in keys[1:])
+    steps = tuple(_step(key) for key in keys[1:])
+
+    def get(ctx):
+        try:
+            val = ctx[root]
+        except KeyError:
+            return None
+
+        # nested dicts, the common case, in one go
+        try:
+            for item in items:
+                val = item(val)
+            return val
+        except (LookupError, TypeError):
+            val = ctx[root]
+
+        for step in steps:
+            if val is None:
+                break
+            val = step(val)
+        return val
+
+    return get
+
+
+class Identifier(Node):
+    """`$name` or `$name.path.to.field`: a value read from the context.
+
+    Missing keys or attributes anywhere on the path give None.  The path is
+    split and turned into getters once, when the node is built.
+    """
+    __slots__ = ('name', 'keys', 'get')
+
+    def __init__(self, name):
+        self.name = name
+        self.keys = tuple(name.split('.'))
+        self.get = _path_getter(self.keys)
+
+    def __unicode__(self):
+        return u'<{} at 0x{}> name:{}'.format(
+            self.__class__.__name__,
+            id(self),
+            self.name,
+        )
+
+    def ast_prop(self):
+        return {
+            'name': self.name,
+        }
+
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(ast['name'])
+
+    def _key(self):
+        return self.name
+
+    def __reduce__(self):
+        # the getter is a closure: rebuild it rather than pickle it
+        return self.__class__, (self.name,)
+
+    def ex(self, ctx):
+        return self.get(ctx)
+
+    def compile(self):
+        return self.get
+
+    def specialize(self, known_ctx=None):
+        if known_ctx and self.keys[0] in known_ctx:
+            return literal(self.get(known_ctx))
+
+        return self
+
 
 class UnaryExp(Exp):
+    __slots__ = ('op', 'exp')
+    _fields = ('exp',)
+
     def __init__(self, op, exp):
         self.op, self.exp = op, exp
 
@@ -211,6 +566,13 @@ class UnaryExp(Exp):
             'exp': self.exp.ast(),
         }
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(Token.from_str(ast['$op']), from_ast(ast['exp']))
+
+    def _key(self):
+        return (self.op, self.exp)
+
     def ex(self, ctx):
         val = self.exp.ex(ctx)
 
@@ -228,10 +590,23 @@ class UnaryExp(Exp):
         else:
             raise RuntimeError('Unknow op "{}"'.format(op))
 
+    def compile(self):
+        fn, exp = self.op.opts['fn'], self.exp.compile()
+
+        return lambda ctx: fn(exp(ctx))
+
+    def specialize(self, known_ctx=None):
+        exp = self.exp.specialize(known_ctx)
+        node = self if exp is self.exp else UnaryExp(self.op, exp)
+
+        return _fold(node) if isinstance(exp, Literal) else node
+
 class BinaryExp(Node):
+    __slots__ = ('op', 'l', 'r')
+    _fields = ('l', 'r')
+
     def __init__(self, op, l, r):
         self.l, self.r, self.op = l, r, op
-        print('rel op: {}'.format(op))
 
     def ex(self, ctx):
         l, r = self.l.ex(ctx), self.r.ex(ctx)
@@ -271,17 +646,77 @@ class BinaryExp(Node):
             'r': self.r.ast(),
         }
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(Token.from_str(ast['$op']), from_ast(ast['l']), from_ast(ast['r']))
+
+    def _key(self):
+        return (self.op, self.l, self.r)
+
+    def compile(self):
+        fn, l = self.op.opts['fn'], self.l.compile()
+
+        # most rules compare against a literal, skip the extra call for it
+        if isinstance(self.r, Literal):
+            r_val = self.r.ex(None)
+            return lambda ctx: fn(l(ctx), r_val)
+
+        r = self.r.compile()
+        return lambda ctx: fn(l(ctx), r(ctx))
+
+    def specialize(self, known_ctx=None):
+        l, r = self.l.specialize(known_ctx), self.r.specialize(known_ctx)
+        node = self if (l is self.l and r is self.r) else self.__class__(self.op, l, r)
+
+        return _fold(node) if isinstance(l, Literal) and isinstance(r, Literal) else node
+
 
 class EqExp(BinaryExp):
+    __slots__ = ('pat',)
+
+    def __init__(self, op, l, r):
+        super(EqExp, self).__init__(op, l, r)
+
+        # a literal pattern is compiled once, when the tree is built
+        self.pat = None
+        if op in (EqOp.RE, EqOp.NR) and type(r) is LiteralRegex:
+            self.pat = r.val
+        elif op in (EqOp.RE, EqOp.NR) and isinstance(r, LiteralString):
+            try:
+                self.pat = re.compile(r.val)
+            except re.error:
+                pass    # raised on evaluation, like any other pattern
+
+    def ex(self, ctx):
+        if self.pat is None:
+            return super(EqExp, self).ex(ctx)
+
+        found = self.pat.search(self.l.ex(ctx))
+        return bool(found) if self.op == EqOp.RE else not found
+
+    def with_children(self, children):
+        # `pat` comes from `r`: built again for the new one
+        return self.__class__(self.op, *children)
+
+    def compile(self):
+        if self.pat is None:
+            return super(EqExp, self).compile()
+
+        search, l = self.pat.search, self.l.compile()
+        if self.op == EqOp.RE:
+            return lambda ctx: bool(search(l(ctx)))
+
+        return lambda ctx: not search(l(ctx))
+
     def ex_op(self, op, l, r):
         if op == EqOp.EQ:
             return l == r
         elif op == EqOp.NE:
             return l != r
         elif op == EqOp.RE:
-            return bool(re.search(r, l))
+            return _op_re(l, r)
         elif op == EqOp.NR:
-            return not re.search(r, l)
+            return _op_nr(l, r)
         elif op == EqOp.ISA:
             # TODO: r maybe string type
             return isinstance(l, r)
@@ -293,17 +728,154 @@ class EqExp(BinaryExp):
             raise RuntimeError('Unknow op "{}"'.format(op))
 
 
-class LogicOrExp(BinaryExp):
+class LogicExp(Node):
+    """`and` / `or` over two or more operands, evaluated left to right.
+
+    A first operand of the same class is spliced in: the left-folded chains
+    the parsers build, `a or b or c`, make one flat node however long they
+    are.  `ast()`, `l` and `r` still describe it as nested binary nodes.
+    """
+    __slots__ = ('op', 'operands')
+    _stop = None    # truth of the operand value that settles the chain
+
+    def __init__(self, op, *operands):
+        if len(operands) < 2:
+            raise ValueError('{} needs two operands or more'.format(self.__class__.__name__))
+        if type(operands[0]) is type(self):
+            operands = operands[0].operands + operands[1:]
+
+        self.op, self.operands = op, tuple(operands)
+
+    @property
+    def l(self):
+        operands = self.operands
+        return operands[0] if len(operands) == 2 else self.__class__(self.op, *operands[:-1])
+
+    @property
+    def r(self):
+        return self.operands[-1]
+
+    def children(self):
+        return list(self.operands)
+
+    def with_children(self, children):
+        return self.__class__(self.op, *children)
+
+    def __unicode__(self):
+        return u'<{} at 0x{}>\n\top:{!r}\n\toperands:{!r}'.format(
+            self.__class__.__name__,
+            id(self),
+            self.op,
+            self.operands,
+        )
+
+    def ast(self):
+        operands = self.operands
+        ast = operands[0].ast()
+        for operand in operands[1:]:
+            ast = {
+                '$type': self.__class__.__name__,
+                '$op': str(self.op),
+                'l': ast,
+                'r': operand.ast(),
+            }
+
+        return ast
+
+    @classmethod
+    def from_ast(cls, ast):
+        # down the left spine without recursing: chains can be long
+        op, rights = ast['$op'], []
+        while ast.get('$type') == cls.__name__:
+            rights.append(from_ast(ast['r']))
+            ast = ast['l']
+
+        return cls(Token.from_str(op), from_ast(ast), *reversed(rights))
+
+    def _key(self):
+        return (self.op, self.operands)
+
+    def compile(self):
+        fns = [operand.compile() for operand in self.operands]
+        if len(fns) == 2:
+            l, r = fns
+            if self._stop:
+                return lambda ctx: l(ctx) or r(ctx)
+            return lambda ctx: l(ctx) and r(ctx)
+
+        if self._stop:
+            def chain(ctx):
+                for fn in fns:
+                    val = fn(ctx)
+                    if val:
+                        return val
+                return val
+        else:
+            def chain(ctx):
+                for fn in fns:
+                    val = fn(ctx)
+                    if not val:
+                        return val
+                return val
+
+        return chain
+
+    def specialize(self, known_ctx=None):
+        operands, last = [], len(self.operands) - 1
+        changed = False
+        for i, operand in enumerate(self.operands):
+            node = operand.specialize(known_ctx)
+            changed = changed or node is not operand
+
+            if isinstance(node, Literal):
+                if bool(node.ex(None)) is self._stop:
+                    # settles it: the operands after are never evaluated
+                    operands.append(node)
+                    changed = changed or i < last
+                    break
+                elif i < last:
+                    # its value is never the result
+                    changed = True
+                    continue
+
+            operands.append(node)
+
+        if not changed:
+            return self
+        elif len(operands) == 1:
+            return operands[0]
+
+        return self.__class__(self.op, *operands)
+
+
+class LogicOrExp(LogicExp):
+    __slots__ = ()
+    _stop = True
+
     def ex(self, ctx):
-        return self.l.ex(ctx) or self.r.ex(ctx)
+        for operand in self.operands:
+            val = operand.ex(ctx)
+            if val:
+                return val
+        return val
 
 
-class LogicAndExp(BinaryExp):
+class LogicAndExp(LogicExp):
+    __slots__ = ()
+    _stop = False
+
     def ex(self, ctx):
-        return self.l.ex(ctx) and self.r.ex(ctx)
+        for operand in self.operands:
+            val = operand.ex(ctx)
+            if not val:
+                return val
+        return val
 
 
 class CondExp(Node):
+    __slots__ = ('cond', 'yes', 'no')
+    _fields = ('cond', 'yes', 'no')
+
     def __init__(self, cond, yes, no):
         self.cond, self.yes, self.no = cond, yes, no
 
@@ -313,6 +885,22 @@ class CondExp(Node):
         else:
             return self.no.ex(ctx)
 
+    def compile(self):
+        cond, yes, no = self.cond.compile(), self.yes.compile(), self.no.compile()
+
+        return lambda ctx: yes(ctx) if cond(ctx) else no(ctx)
+
+    def specialize(self, known_ctx=None):
+        cond = self.cond.specialize(known_ctx)
+        if isinstance(cond, Literal):
+            return (self.yes if cond.ex(None) else self.no).specialize(known_ctx)
+
+        yes, no = self.yes.specialize(known_ctx), self.no.specialize(known_ctx)
+        if cond is self.cond and yes is self.yes and no is self.no:
+            return self
+
+        return CondExp(cond, yes, no)
+
     def __unicode__(self):
         # TODO: improve this output
         return u'<{} at 0x{}>\n\tc:{!r}\n\tyes:{!r}\n\tno:{!r}'.format(
@@ -330,6 +918,29 @@ class CondExp(Node):
             'false': self.no.ast(),
         }
 
+    @classmethod
+    def from_ast(cls, ast):
+        return cls(from_ast(ast['cond']), from_ast(ast['true']), from_ast(ast['false']))
+
+    def _key(self):
+        return (self.cond, self.yes, self.no)
+
+
+_node_classes = dict((cls.__name__, cls) for cls in (
+    Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex,
+    Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+))
+
+
+def from_ast(ast):
+    """Rebuild a tree from the dict `Node.ast()` returned for it."""
+    try:
+        cls = _node_classes[ast['$type']]
+    except KeyError:
+        raise ValueError('unknown node type {!r}'.format(ast.get('$type')))
+
+    return cls.from_ast(ast)
+
 
 # }}} Syntax
 
@@ -340,7 +951,10 @@ def make_binary_exp_process_fn(node_cls):
         # print('exp for {}:{!r}'.format(node_cls.__name__, ast))
         l = ast.l
 
-        if ast.op_and_r:
+        if ast.op_and_r and issubclass(node_cls, LogicExp):
+            # one operator per class: a single n-ary node
+            return node_cls(ast.op_and_r[0][0], l, *(r for _, r in ast.op_and_r))
+        elif ast.op_and_r:
             for op, r in ast.op_and_r:
                 l = node_cls(op, l, r)
 
@@ -366,7 +980,8 @@ class YepSemantics(object):
 
     @staticmethod
     def _merge_ast(ast, sep=''):
-        return sep.join(ast) if isinstance(ast, list) else ast
+        # grouped ops like `'not' / +/ 'in'` also carry the spaces in between
+        return sep.join(a for a in ast if a.strip()) if isinstance(ast, list) else ast
 
     def OP_BINARY(self, ast):
         # print('OP_BINARY:{!r}'.format(ast))
@@ -409,4 +1024,10 @@ class YepSemantics(object):
         # print('number:{!r}'.format(ast))
         return LiteralNumber(ast)
 
+    def identifier(self, ast):
+        return Identifier(ast)
+
+    def regex(self, ast):
+        return LiteralRegex(ast.pat, ast.flags)
+
 # }}} Semantic
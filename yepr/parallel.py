@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Evaluate expressions over a large batch of contexts on several processes.
+
+    for values in evaluate_many(['a and b', tree], contexts, workers=8):
+        ...     # one list per context, in the order of `contexts`
+
+The trees are pickled once per worker, through the pool initializer, and
+compiled there; only the contexts and the results travel per chunk.
+
+`parse_many()`, behind `Parser.parse_many()`, parses on several processes
+instead: the trees come back as `serialize` code streams, one per chunk,
+which are smaller and quicker to rebuild than pickled nodes.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import str
+from array import array
+import itertools
+import multiprocessing
+import pickle
+
+from .fast_parser import ParseError
+from .nodes import Node
+from . import serialize
+
+
+_fns = None     # compiled expressions of the current worker
+
+
+def _init_worker(trees):
+    global _fns
+    _fns = [tree.compile() for tree in trees]
+
+
+def _ex_worker(ctx):
+    return [fn(ctx) for fn in _fns]
+
+
+def evaluate_many(exprs, contexts, workers=None, chunksize=256, parser=None, context=None):
+    """Yield the values of every expression for each context, in order.
+
+    `exprs` are trees or text, parsed here with `parser`.  `workers` defaults
+    to the number of CPUs; 0 evaluates in this process.  `context` is the
+    multiprocessing context to start them with, e.g. `get_context('spawn')`.
+    """
+    trees = []
+    for expr in exprs:
+        if not isinstance(expr, Node):
+            if parser is None:
+                from .parser import Parser
+                parser = Parser()
+            expr = parser.parse(expr)
+        trees.append(expr)
+
+    if workers == 0:
+        fns = [tree.compile() for tree in trees]
+        for ctx in contexts:
+            yield [fn(ctx) for fn in fns]
+        return
+
+    pool = (context or multiprocessing).Pool(workers, initializer=_init_worker, initargs=(trees,))
+    # Pool.imap would drain `contexts` as fast as it can read it, hand it
+    # bounded windows instead so a long stream runs in constant memory
+    window = chunksize * (workers or multiprocessing.cpu_count()) * 4
+    contexts = iter(contexts)
+    try:
+        while True:
+            batch = list(itertools.islice(contexts, window))
+            if not batch:
+                break
+
+            for values in pool.imap(_ex_worker, batch, chunksize):
+                yield values
+        pool.close()
+    except BaseException:
+        # includes the generator being dropped half way
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+_parser = None  # parser of the current worker
+
+
+def _init_parse_worker(options):
+    global _parser
+    from .parser import Parser
+    _parser = Parser(cache_size=0, **options)
+
+
+def _picklable(e):
+    try:
+        pickle.dumps(e)
+    except Exception:
+        return RuntimeError('{}: {}'.format(e.__class__.__name__, e))
+    return e
+
+
+def _parse_one(parse, text):
+    """The tree of `text`, or the error parse_many() returns for it, the
+    same whether it comes back from a worker or not."""
+    try:
+        return parse(text)
+    except Exception as e:
+        # grako's FailedParse holds its whole buffer, and may not survive pickling
+        if type(e).__name__ == 'FailedParse' and type(e).__module__.startswith('grako.'):
+            return ParseError(str(getattr(e, 'item', e)), text, e.pos)
+        return _picklable(e)
+
+
+def _parse_worker(texts):
+    """Parse a chunk: one code stream for the trees, the errors by position."""
+    codes, pool, pool_index, offsets, errors = array(str('i')), [], {}, [], {}
+    for i, text in enumerate(texts):
+        offsets.append(len(codes))
+        tree = _parse_one(_parser.parse, text)
+        if isinstance(tree, Exception):
+            errors[i] = tree
+        else:
+            serialize.encode(tree, codes, pool, pool_index)
+    offsets.append(len(codes))
+
+    return codes, pool, offsets, errors
+
+
+def parse_many(parser, texts, workers=0, chunksize=256):
+    """Trees for `texts` in order, or the exception raised for one.
+
+    The workers parse with the options of `parser`.  `workers` defaults to
+    0, parsing in this process as does a single chunk; None is one per CPU.
+    """
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    workers = min(multiprocessing.cpu_count() if workers is None else workers, len(chunks))
+    if workers < 2:
+        return [_parse_one(parser._parse, text) for text in texts]
+
+    options = dict(engine=parser.engine, memoize=parser.memoize, left_recursion=parser.left_recursion)
+    pool = multiprocessing.Pool(workers, initializer=_init_parse_worker, initargs=(options,))
+    try:
+        results = pool.map(_parse_worker, chunks, 1)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    trees = []
+    for codes, pool, offsets, errors in results:
+        for i in range(len(offsets) - 1):
+            trees.append(errors[i] if i in errors else serialize.decode(codes, pool, offsets[i], offsets[i + 1]))
+
+    return trees
@@ -3,17 +3,84 @@
 from __future__ import print_function, division, absolute_import, unicode_literals
 
 from builtins import object
-from .yep_grako import yepParser
+import threading
+
 from .nodes import YepSemantics
+from .cache import LRUCache
+from .fast_parser import FastParser
 
 
 class Parser(object):
-    def __init__(self):
-        pass
+    def __init__(self, cache_size=1024, engine='grako', memoize=False, left_recursion=False):
+        """Tuning of the grako engine:
+
+        `memoize`: keep grako's packrat memo for every rule (True), none
+        (False) or the rules named in an iterable.  yep.grako never parses
+        the same rule twice at one position, so the memo is only overhead.
+
+        `left_recursion`: grako's support for left-recursive rules, which
+        yep.grako has none of.  Needs the memo of every rule.
+        """
+        if engine not in ('grako', 'fast'):
+            raise ValueError('unknown parser engine "{}"'.format(engine))
+        if left_recursion and memoize is not True:
+            raise ValueError('left_recursion needs memoize=True')
+
+        self.engine = engine
+        self.memoize = memoize
+        self.left_recursion = left_recursion
+        # parsed trees keyed by expression text, shared by every caller
+        self.cache = LRUCache(cache_size)
+        # grako parsers keep state while parsing: one per thread, reused
+        self._local = threading.local()
 
     def parse(self, expr):
-        parser = yepParser(parseinfo=False)
-        semantics = YepSemantics()
+        return self.cache.get_or_create(expr, self._parse)
+
+    def parse_many(self, exprs, workers=0, chunksize=256):
+        """Parse a batch of expressions, as a list in the order of `exprs`.
+
+        An expression that fails to parse does not stop the batch: an
+        exception takes its place in the list, a `ParseError` for syntax
+        errors whatever the engine.  Equal texts are parsed once and share
+        their tree; the others are parsed in this process, or on `workers`
+        processes (None: one per CPU), `chunksize` at a time.
+        """
+        from .parallel import parse_many
+
+        exprs = list(exprs)
+        trees, todo = {}, []
+        for expr in exprs:
+            if expr not in trees:
+                trees[expr] = self.cache.get(expr)
+                if trees[expr] is None:
+                    todo.append(expr)
+
+        for expr, tree in zip(todo, parse_many(self, todo, workers, chunksize)):
+            trees[expr] = tree
+            if not isinstance(tree, Exception):
+                self.cache.set(expr, tree)
+
+        return [trees[expr] for expr in exprs]
+
+    def cache_info(self):
+        return self.cache.info()
+
+    def _parse(self, expr):
+        if self.engine == 'fast':
+            return FastParser().parse(expr)
+
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            # grako is only imported once a process parses with it
+            from .grako_engine import GrakoParser
+
+            parser = self._local.parser = GrakoParser(
+                memoize=self.memoize,
+                left_recursion=self.left_recursion,
+                parseinfo=False,
+                semantics=YepSemantics(),
+            )
         startrule = 'yep'
 
         ast = parser.parse(
@@ -21,7 +88,6 @@ class Parser(object):
             startrule,
             filename=None,
             trace=False,
-            semantics=semantics,
             whitespace=None,
         )
         # nameguard=nameguard
@@ -35,6 +101,8 @@ class Parser(object):
 def main(filename, startrule, trace=False, yep=False, whitespace=None, nameguard=None):
     import json
     from pprint import pprint
+    from .yep_grako import yepParser
+
     with open(filename) as f:
         text = f.read()
     parser = yepParser(parseinfo=False)
@@ -68,6 +136,8 @@ if __name__ == '__main__':
 
     class ListRules(argparse.Action):
         def __call__(self, parser, namespace, values, option_string):
+            from .yep_grako import yepParser
+
             print('Rules:')
             for r in yepParser.rule_list():
                 print(r)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Load named expressions from a rule file, through a precompiled cache.
+
+    rules = RuleSet(rulefile.load('rules.yepr'))
+
+A rule file has one `name: expression` per line, blank lines and lines
+starting with `#` being skipped; a `.json` file holds an object of
+name -> expression instead.  Names are unique.
+
+The parsed trees are kept next to the file, in `rules.yepr.cache`, as a
+`serialize` bundle looked up by the source hash of each rule's text.  The
+cache is memory-mapped, and a tree found there is only decoded when its
+rule is first read from the returned `Rules`.  Only the rules new or
+changed since the cache was written are parsed (with
+`Parser.parse_many()`), after which the cache is written again.  A cache
+that cannot be read or written is ignored.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import io
+import json
+import mmap
+import os
+import re
+
+try:
+    from collections.abc import Sequence
+except ImportError:     # py2
+    from collections import Sequence
+
+from . import serialize
+
+
+_LINE = re.compile(r'([^\s:#][^\s:]*)\s*:\s*(.+)$')
+
+
+class _Pairs(list):
+    """A JSON object, as its (key, value) pairs in order."""
+
+
+def read(path):
+    """`(name, expression text, line number)` per rule of the file at `path`."""
+    with io.open(path, encoding='utf-8') as f:
+        text = f.read()
+
+    if path.endswith('.json'):
+        pairs = json.loads(text, object_pairs_hook=_Pairs)
+        if not isinstance(pairs, _Pairs) or not all(isinstance(expr, type('')) for _, expr in pairs):
+            raise ValueError('{}: expecting an object of name -> expression'.format(path))
+        rules = [(name, expr, None) for name, expr in pairs]
+    else:
+        rules = []
+        for lineno, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            m = _LINE.match(line)
+            if m is None:
+                raise ValueError('{}:{}: expecting "name: expression"'.format(path, lineno))
+            rules.append((m.group(1), m.group(2), lineno))
+
+    seen = set()
+    for name, _, lineno in rules:
+        if name in seen:
+            raise ValueError('{}: rule {!r} defined twice'.format(_where(path, lineno), name))
+        seen.add(name)
+
+    return rules
+
+
+def _where(path, lineno):
+    return path if lineno is None else '{}:{}'.format(path, lineno)
+
+
+class Rules(Sequence):
+    """`(name, tree)` per rule, the trees from the cache decoded on first access."""
+
+    def __init__(self, names, exprs, parser=None):
+        self.names = names
+        self._exprs = exprs
+        self._parser = parser
+        self._trees = [None] * len(names)
+        self._bundle, self._at = None, {}   # rule -> its index in the cache
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        return self.names[i], self.tree(i)
+
+    def tree(self, i):
+        i = range(len(self))[i]     # `_at` has positive indexes
+        tree = self._trees[i]
+        if tree is None:
+            at = self._at.get(i)
+            try:
+                tree = None if at is None else self._bundle.node(at)
+            except (ValueError, IndexError):
+                pass    # a code stream corrupted after its header was read: as without cache
+
+            if tree is None:
+                if self._parser is None:
+                    from .parser import Parser
+                    self._parser = Parser()
+                tree = self._parser.parse(self._exprs[i])
+            self._trees[i] = tree
+
+        return tree
+
+
+def _cached(cache_path, hashes):
+    """The cache file's bundle, source hash -> index in it for the `hashes`
+    it has, and whether the file needs writing again."""
+    try:
+        with open(cache_path, 'rb') as f:
+            # stays mapped as long as the bundle: the file is only ever replaced
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):  # missing, unreadable, empty
+        return None, {}, True
+
+    try:
+        bundle = serialize.Bundle(data)
+    except Exception:
+        return None, {}, True   # corrupt, or from another format version
+
+    found, stale = {}, False
+    for i, h in enumerate(bundle.hashes):
+        if h not in hashes:
+            stale = True
+        elif h not in found:
+            found[h] = i
+
+    return bundle, found, stale
+
+
+def _write(cache_path, rules):
+    tmp = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            serialize.dump(rules, f)
+        getattr(os, 'replace', os.rename)(tmp, cache_path)
+    except (IOError, OSError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load(path, parser=None, cache_path=None):
+    """A `Rules` of `(name, tree)` per rule of the file at `path`, in file order.
+
+    `cache_path` defaults to `path + '.cache'`, False disables the cache.
+    Raises ValueError for the first rule that does not parse.
+    """
+    rules = read(path)
+    hashes = [serialize.source_hash(expr) for _, expr, _ in rules]
+    if cache_path is None:
+        cache_path = path + '.cache'
+
+    loaded = Rules([name for name, _, _ in rules], [expr for _, expr, _ in rules], parser)
+    found, stale = {}, False
+    if cache_path is not False:
+        loaded._bundle, found, stale = _cached(cache_path, set(hashes))
+        loaded._at = dict((i, found[h]) for i, h in enumerate(hashes) if h in found)
+
+    todo = [i for i, h in enumerate(hashes) if h not in found]
+    if todo:
+        if parser is None:
+            from .parser import Parser
+            parser = loaded._parser = Parser()
+
+        for i, tree in zip(todo, parser.parse_many(rules[i][1] for i in todo)):
+            if isinstance(tree, Exception):
+                name, _, lineno = rules[i]
+                raise ValueError('{}: rule {!r}: {}'.format(_where(path, lineno), name, tree))
+            loaded._trees[i] = tree
+
+    if cache_path is not False and (todo or stale):
+        entries = [(name, expr, loaded.tree(i)) for i, (name, expr, _) in enumerate(rules)]
+        loaded._bundle = None   # all decoded: unmapped before the file is replaced
+        _write(cache_path, entries)
+
+    return loaded
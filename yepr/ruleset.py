@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""Evaluate many named expressions against one context, sharing common work.
+
+Trees added to a `RuleSet` are hash-consed into one DAG: structurally equal
+subtrees (see `Node.__eq__`) become a single node, so with::
+
+    rules = RuleSet()
+    rules.add('a', 'region == "eu" and tier >= 2')
+    rules.add('b', 'region == "eu" and tier >= 2 or vip')
+
+`region == "eu" and tier >= 2` is evaluated at most once per `rules.ex(ctx)`,
+however many rules refer to it.  Like `ex()`, subtrees are only evaluated
+when a rule actually gets to them.
+
+Regex tests (`=~`, `!~`) of the same subtree against start-anchored literal
+patterns, say `$agent =~ /^curl/` in one rule and `$agent !~ /^Mozilla/` in
+another, are answered together: the first one evaluated matches the value
+against all the patterns at once (see `MultiPattern`), the others read its
+result.  Likewise, from `min_keywords` distinct literal strings tested with
+`in`/`not in` against the same subtree, `"union" in $body`..., a single
+Aho-Corasick pass over the text answers all of them (see `KeywordSet`).
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object
+import threading
+
+from .nodes import EqOp, BinaryOp, Node, Literal, LiteralString, BinaryExp, EqExp
+from .multiregex import MultiPattern, mergeable
+from .keywords import KeywordSet, MIN_KEYWORDS
+
+
+_missing = object()
+
+
+class RuleSet(object):
+    def __init__(self, rules=(), parser=None, min_keywords=MIN_KEYWORDS):
+        """`rules`: a mapping or `(name, expr)` pairs, expr being text or a tree."""
+        self.parser = parser
+        self.min_keywords = min_keywords
+        self.names = []
+        self.roots = []
+
+        self._interned = {}
+        self._nodes = 0
+        self._compiled = None
+        self._local = threading.local()
+
+        for name, expr in (rules.items() if hasattr(rules, 'items') else rules):
+            self.add(name, expr)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, expr):
+        if not isinstance(expr, Node):
+            if self.parser is None:
+                from .parser import Parser
+                self.parser = Parser()
+            expr = self.parser.parse(expr)
+
+        self.names.append(name)
+        self.roots.append(self._intern(expr))
+        self._compiled = None
+
+    def _intern(self, node):
+        """Canonical copy of `node`, built from canonical children."""
+        self._nodes += 1
+
+        originals = node.children()
+        children = [self._intern(child) for child in originals]
+        if node._key() is None:
+            key = (type(node), id(node))    # only ever equal to itself
+        elif not children:
+            # literals, identifiers: nothing below to compare by identity
+            key = (type(node), node._key())
+        else:
+            # children are canonical already, comparing them by identity is enough
+            key = (type(node), getattr(node, 'op', None)) + tuple(id(c) for c in children)
+
+        canonical = self._interned.get(key)
+        if canonical is None:
+            canonical = node
+            if any(c is not o for c, o in zip(children, originals)):
+                canonical = node.with_children(children)
+
+            # keep `node` alive with it, or its id() could be reused
+            self._interned[key] = canonical, node
+        else:
+            canonical = canonical[0]
+
+        return canonical
+
+    def info(self):
+        """Node counts: as added, after merging equal subtrees, and evaluated through the memo."""
+        refs = self._refs()
+        return {
+            'rules': len(self.names),
+            'nodes': self._nodes,
+            'distinct': len(refs),
+            'shared': sum(1 for node, count in refs.values() if self._is_shared(node, count)),
+        }
+
+    def _refs(self):
+        """id -> (node, number of parents) over the whole DAG, roots counting once per rule."""
+        refs = {}
+        todo = list(self.roots)
+        while todo:
+            node = todo.pop()
+            seen = refs.get(id(node))
+            refs[id(node)] = (node, seen[1] + 1 if seen else 1)
+            if not seen:
+                todo.extend(node.children())
+
+        return refs
+
+    @staticmethod
+    def _is_shared(node, count):
+        # a literal costs less than the memo lookup
+        return count > 1 and not isinstance(node, Literal)
+
+    def _groups(self, refs):
+        """id(test) -> (group, position) for the tests answered together with others."""
+        regexes, keywords = {}, {}
+        for node, _ in refs.values():
+            cls = type(node)
+            if cls is EqExp and node.pat is not None and mergeable(node.pat):
+                key = (node.pat.pattern, node.pat.flags)
+                regexes.setdefault(id(node.l), []).append((node, key, node.pat))
+            elif (cls is BinaryExp and node.op in (BinaryOp.IN, BinaryOp.NOTIN)
+                  and type(node.l) is LiteralString and node.l.val):
+                keywords.setdefault(id(node.r), []).append((node, node.l.val, node.l.val))
+
+        groups = {}
+        for tests in regexes.values():
+            self._group(tests, 2, lambda patterns: _Group(MultiPattern(patterns), 'l', self._local), groups)
+        for tests in keywords.values():
+            self._group(tests, self.min_keywords, lambda words: _Group(KeywordSet(words), 'r', self._local), groups)
+
+        return groups
+
+    @staticmethod
+    def _group(tests, least, make, groups):
+        """Group `(node, key, item)` tests if they have at least `least` distinct items."""
+        items, positions = [], {}
+        for node, key, item in tests:
+            if key not in positions:
+                positions[key] = len(items)
+                items.append(item)
+
+        if len(items) >= max(least, 2):
+            group = make(items)
+            for node, key, _ in tests:
+                groups[id(node)] = group, positions[key]
+
+    def compile(self):
+        """`(name, f(ctx))` per rule, shared subtrees going through the memo."""
+        refs, linked = self._refs(), {}
+        local, slots = self._local, []
+        groups = self._groups(refs)
+
+        def link(node):
+            new = linked.get(id(node))
+            if new is None:
+                new = node
+                children = node.children()
+                if children:
+                    new = node.with_children([link(child) for child in children])
+
+                if id(node) in groups:
+                    group, position = groups[id(node)]
+                    if group.slot is None:
+                        group.operand, group.slot = getattr(new, group.field), len(slots)
+                        slots.append(group)
+                    new = _Matched(new, group, position)
+
+                if self._is_shared(*refs[id(node)]):
+                    new = _Shared(new, len(slots), local)
+                    slots.append(new)
+
+                linked[id(node)] = new
+
+            return new
+
+        fns = [(name, link(root).compile()) for name, root in zip(self.names, self.roots)]
+        self._compiled = fns, len(slots)
+        return self._compiled
+
+    def ex(self, ctx):
+        """Evaluate every rule against `ctx`, as a name -> value dict."""
+        fns, nslots = self._compiled or self.compile()
+
+        local = self._local
+        local.memo = [_missing] * nslots
+        try:
+            return dict((name, fn(ctx)) for name, fn in fns)
+        finally:
+            local.memo = None
+
+
+class _Shared(Node):
+    """A subtree with several parents, evaluated once per `RuleSet.ex()`."""
+    __slots__ = ('node', 'slot', 'local', 'fn')
+
+    def __init__(self, node, slot, local):
+        self.node, self.slot, self.local = node, slot, local
+        self.fn = None
+
+    def ex(self, ctx):
+        memo = self.local.memo
+        val = memo[self.slot]
+        if val is _missing:
+            val = memo[self.slot] = self.node.ex(ctx)
+        return val
+
+    def compile(self):
+        # every parent asks for it, build it once
+        if self.fn is None:
+            fn, slot, local = self.node.compile(), self.slot, self.local
+
+            def shared(ctx):
+                memo = local.memo
+                val = memo[slot]
+                if val is _missing:
+                    val = memo[slot] = fn(ctx)
+                return val
+
+            self.fn = shared
+
+        return self.fn
+
+
+class _Group(object):
+    """Tests of one subtree (`field` of the test nodes), run together once per `RuleSet.ex()`."""
+    __slots__ = ('matcher', 'field', 'local', 'slot', 'operand', 'fn')
+
+    def __init__(self, matcher, field, local):
+        self.matcher, self.field, self.local = matcher, field, local
+        self.slot = self.operand = self.fn = None
+
+    def compile(self):
+        if self.fn is None:
+            search, operand, slot, local = self.matcher.search, self.operand.compile(), self.slot, self.local
+
+            def found(ctx):
+                memo = local.memo
+                val = memo[slot]
+                if val is _missing:
+                    val = memo[slot] = search(operand(ctx))
+                return val
+
+            self.fn = found
+
+        return self.fn
+
+
+class _Matched(Node):
+    """A test answered from its `_Group`."""
+    __slots__ = ('node', 'group', 'position')
+
+    def __init__(self, node, group, position):
+        self.node, self.group, self.position = node, group, position
+
+    def ex(self, ctx):
+        return self.compile()(ctx)
+
+    def compile(self):
+        fn, found, i = self.node.compile(), self.group.compile(), self.position
+        negate = self.node.op in (EqOp.NR, BinaryOp.NOTIN)
+
+        def matched(ctx):
+            try:
+                val = found(ctx)
+            except Exception:
+                val = None
+            if val is None:
+                return fn(ctx)  # raises, or handles other types, as the test alone would
+
+            return not val[i] if negate else val[i]
+
+        return matched
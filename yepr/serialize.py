@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""Compact binary form of parsed rule sets.
+
+A bundle stores many named trees so a process can load them back without
+parsing (and without importing grako)::
+
+    data = serialize.dumps((name, text, parser.parse(text)) for name, text in rules)
+    bundle = serialize.loads(data)
+    bundle.node(0).ex(ctx)
+
+Layout, all little-endian:
+
+    header      magic 'YEPR', format version, flags, rule count, code count, meta size
+    meta        utf-8 JSON: {"names": [...], "pool": [literal values]}
+    hashes      u64 per rule, `source_hash()` of its text, for cache invalidation
+    offsets     u32 per rule + 1, where each rule starts in `codes`
+    codes       i32 stream of every tree in post-order: one tag per node,
+                followed by a pool index for literals carrying a value and
+                for identifiers' names, two for regexes (pattern, flags), or
+                by the operand count for and/or
+
+Trees are decoded lazily, on first access.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from builtins import object, str
+from array import array
+import hashlib
+import json
+import struct
+import sys
+
+from .nodes import (
+    UnaryOp, LogicOp, BinaryOp, EqOp,
+    Literal, LiteralString, LiteralNumber, LiteralTrue, LiteralFalse, LiteralNull, LiteralRegex,
+    Identifier, UnaryExp, BinaryExp, EqExp, LogicOrExp, LogicAndExp, CondExp,
+)
+
+
+MAGIC = b'YEPR'
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct('<4sHHIII')
+
+# how a tag consumes its operands
+_VAL, _CONST, _UNARY, _BINARY, _COND, _NAME, _NARY, _REGEX = range(8)
+
+# tag -> (kind, node class, op); only ever append, or bump FORMAT_VERSION
+_TAGS = [
+    (_VAL, LiteralString, None),
+    (_VAL, LiteralNumber, None),
+    (_VAL, Literal, None),
+    (_CONST, LiteralTrue, None),
+    (_CONST, LiteralFalse, None),
+    (_CONST, LiteralNull, None),
+    (_COND, CondExp, None),
+    (_NARY, LogicOrExp, LogicOp.OR),
+    (_NARY, LogicAndExp, LogicOp.AND),
+] + [
+    (_UNARY, UnaryExp, op)
+    for op in (UnaryOp.NOT, UnaryOp.PLUS, UnaryOp.MINUS, UnaryOp.HASH)
+] + [
+    (_BINARY, BinaryExp, op)
+    for op in (BinaryOp.LE, BinaryOp.LT, BinaryOp.GE, BinaryOp.GT, BinaryOp.IN, BinaryOp.NOTIN)
+] + [
+    (_BINARY, EqExp, op)
+    for op in (EqOp.EQ, EqOp.NE, EqOp.RE, EqOp.NR, EqOp.ISA, EqOp.ISNOT, EqOp.IS)
+] + [
+    (_NAME, Identifier, None),
+    (_REGEX, LiteralRegex, None),
+]
+
+_TAG_OF = dict(((cls, op), tag) for tag, (_, cls, op) in enumerate(_TAGS))
+
+
+def source_hash(text):
+    """64 bit digest of an expression's source text."""
+    return struct.unpack('<Q', hashlib.sha1(text.encode('utf-8')).digest()[:8])[0]
+
+
+# single trees {{{
+# literal values the JSON pool stores as they are (2 ** 64: python 2's long)
+_SCALARS = (type(''), int, type(2 ** 64), float, type(None))
+
+
+def _pooled(val, pool, pool_index):
+    # 1, 1.0 and True compare equal but must stay apart
+    key = (type(val), val)
+    if key not in pool_index:
+        pool_index[key] = len(pool)
+        pool.append(val)
+    return pool_index[key]
+
+
+def encode(node, codes, pool, pool_index):
+    """Append `node` to `codes`, adding its literal values to `pool`."""
+    order, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.children() if hasattr(node, 'children') else ())
+
+    for node in reversed(order):
+        try:
+            tag = _TAG_OF[node.__class__, getattr(node, 'op', None)]
+        except KeyError:
+            raise TypeError('cannot serialize {!r}'.format(node))
+
+        codes.append(tag)
+        kind = _TAGS[tag][0]
+        if kind == _VAL and not isinstance(node.val, _SCALARS):
+            raise TypeError('cannot serialize {!r}: {} value'.format(node, type(node.val).__name__))
+
+        if kind in (_VAL, _NAME):
+            codes.append(_pooled(node.val if kind == _VAL else node.name, pool, pool_index))
+        elif kind == _REGEX:
+            codes.append(_pooled(node.pat, pool, pool_index))
+            codes.append(_pooled(node.flags, pool, pool_index))
+        elif kind == _NARY:
+            codes.append(len(node.operands))
+
+
+def decode(codes, pool, start=0, end=None):
+    """Rebuild the tree stored in `codes[start:end]`, ValueError if it is corrupt."""
+    end = len(codes) if end is None else end
+    stack = []
+    push, pop = stack.append, stack.pop
+    tags = _TAGS
+
+    i = start
+    try:
+        while i < end:
+            kind, cls, op = tags[codes[i]]
+            i += 1
+
+            if kind == _VAL or kind == _NAME:
+                push(cls(pool[codes[i]]))
+                i += 1
+            elif kind == _BINARY:
+                r = pop()
+                push(cls(op, pop(), r))
+            elif kind == _NARY:
+                n = codes[i]
+                i += 1
+                if not 2 <= n <= len(stack):
+                    raise ValueError('corrupt code stream')
+                operands = stack[-n:]
+                del stack[-n:]
+                push(cls(op, *operands))
+            elif kind == _UNARY:
+                push(cls(op, pop()))
+            elif kind == _CONST:
+                push(cls())
+            elif kind == _REGEX:
+                push(cls(pool[codes[i]], pool[codes[i + 1]]))
+                i += 2
+            else:
+                no, yes = pop(), pop()
+                push(cls(pop(), yes, no))
+    except IndexError:
+        # an operand, tag or pool entry the stream does not have
+        raise ValueError('corrupt code stream')
+
+    if len(stack) != 1:
+        raise ValueError('corrupt code stream')
+    return stack[0]
+# }}} single trees
+
+
+# bundles {{{
+def _to_le(arr):
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def _tobytes(arr):
+    arr = _to_le(arr)
+    return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+
+def _frombytes(typecode, data):
+    arr = array(str(typecode))
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    return _to_le(arr)
+
+
+def dumps(rules):
+    """Serialize `(name, source text, node)` triples into one bundle."""
+    names, hashes = [], array(str('Q'))
+    offsets, codes = array(str('I')), array(str('i'))
+    pool, pool_index = [], {}
+
+    for name, text, node in rules:
+        names.append(name)
+        hashes.append(source_hash(text))
+        offsets.append(len(codes))
+        encode(node, codes, pool, pool_index)
+    offsets.append(len(codes))
+
+    meta = json.dumps({'names': names, 'pool': pool}, separators=(',', ':')).encode('utf-8')
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(names), len(codes), len(meta))
+
+    return b''.join([header, meta, _tobytes(hashes), _tobytes(offsets), _tobytes(codes)])
+
+
+def dump(rules, f):
+    f.write(dumps(rules))
+
+
+def loads(data):
+    return Bundle(data)
+
+
+def load(f):
+    return Bundle(f.read())
+
+
+class Bundle(object):
+    """Read side of `dumps()`; `data` may be bytes, a memoryview or an mmap.
+
+    On python 3 (little-endian) the arrays are views of `data`, not copies.
+    """
+
+    def __init__(self, data):
+        data = memoryview(data)
+
+        magic, version, _, count, ncodes, meta_size = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('not a yepr bundle')
+        if version != FORMAT_VERSION:
+            raise ValueError('bundle format {} is not supported (expecting {})'.format(
+                version, FORMAT_VERSION))
+
+        pos = _HEADER.size
+        meta = json.loads(data[pos:pos + meta_size].tobytes().decode('utf-8'))
+        pos += meta_size
+
+        self.names, self.pool = meta['names'], meta['pool']
+        self.hashes, pos = self._array('Q', data, pos, count)
+        self.offsets, pos = self._array('I', data, pos, count + 1)
+        self.codes, pos = self._array('i', data, pos, ncodes)
+
+        self._nodes = [None] * count
+
+    @staticmethod
+    def _array(typecode, data, pos, count):
+        end = pos + array(str(typecode)).itemsize * count
+        if end > len(data):
+            raise ValueError('truncated bundle')
+
+        data = data[pos:end]
+        if sys.byteorder == 'little' and hasattr(data, 'cast'):
+            return data.cast(str(typecode)), end   # a view: nothing read before it is needed
+
+        return _frombytes(typecode, data.tobytes()), end
+
+    def __len__(self):
+        return len(self.names)
+
+    def node(self, i):
+        node = self._nodes[i]
+        if node is None:
+            node = self._nodes[i] = decode(
+                self.codes, self.pool, self.offsets[i], self.offsets[i + 1])
+
+        return node
+
+    def items(self):
+        return [(name, self.node(i)) for i, name in enumerate(self.names)]
+# }}} bundles
@@ -163,6 +163,8 @@ class yepParser(Parser):
     @graken()
     def _primary_expression_(self):
         with self._choice():
+            with self._option():
+                self._identifier_()
             with self._option():
                 self._constant_()
             with self._option():
@@ -172,6 +174,12 @@ class yepParser(Parser):
                 self._token(')')
             self._error('no available options')
 
+    @graken()
+    def _identifier_(self):
+        self._pattern(r'\$')
+        self._pattern(r'[A-Za-z_][A-Za-z_0-9]*(?:\.[A-Za-z_0-9]+)*')
+        self.ast['@'] = self.last_node
+
     @graken()
     def _constant_(self):
         with self._choice():
@@ -179,6 +187,8 @@ class yepParser(Parser):
                 self._number_()
             with self._option():
                 self._string_()
+            with self._option():
+                self._regex_()
             self._error('no available options')
 
     @graken()
@@ -201,6 +211,20 @@ class yepParser(Parser):
         self._pattern(r'[A-Za-z_](?:[A-Za-z_0-9.-]*[A-Za-z_])?')
         self.ast['@'] = self.last_node
 
+    @graken()
+    def _regex_(self):
+        self._pattern(r'\/')
+        self._pattern(r'(?:[^\/\\\n]|\\.)+')
+        self.ast['pat'] = self.last_node
+        self._pattern(r'\/')
+        self._pattern(r'[imsx]*(?![A-Za-z_0-9])')
+        self.ast['flags'] = self.last_node
+
+        self.ast._define(
+            ['pat', 'flags'],
+            []
+        )
+
     @graken()
     def _quoted_string_(self):
         with self._choice():
@@ -447,6 +471,9 @@ class yepSemantics(object):
     def primary_expression(self, ast):
         return ast
 
+    def identifier(self, ast):
+        return ast
+
     def constant(self, ast):
         return ast
 
@@ -459,6 +486,9 @@ class yepSemantics(object):
     def simple_string(self, ast):
         return ast
 
+    def regex(self, ast):
+        return ast
+
     def quoted_string(self, ast):
         return ast
 